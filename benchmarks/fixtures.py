@@ -0,0 +1,129 @@
+"""
+Builds stand-in pages for NST and baseball-reference with the same structure the scrapers read:
+    games.php -> One 'Limited Report' link per game in a season
+    game.php -> A limited game report with every individual, on-ice and goalie table, each with
+                a CSV button that downloads it like the DataTables button on NST does
+    schedule -> A team's schedule and results table
+
+Recorded pages can be used instead by saving them as games.php, game.php and schedule.shtml in
+benchmarks/fixtures/.
+"""
+
+import os
+import random
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+GAME_STATES = ['all', 'ev', 'pp', 'pk']
+
+SKATER_COLUMNS = ['Player', 'Position', 'TOI', 'Goals', 'Total Assists', 'First Assists',
+                  'Second Assists', 'Total Points', 'IPP', 'Shots', 'SH%', 'ixG', 'iCF', 'iFF',
+                  'iSCF', 'iHDCF', 'Rush Attempts', 'Rebounds Created', 'PIM',
+                  'Total Penalties', 'Minor', 'Major', 'Misconduct', 'Penalties Drawn',
+                  'Giveaways', 'Takeaways', 'Hits', 'Hits Taken', 'Shots Blocked',
+                  'Faceoffs Won', 'Faceoffs Lost', 'Faceoffs %']
+
+# Stands in for the DataTables CSV export, which the fixture can't load from its CDN offline
+DOWNLOAD_CSV_JS = """
+function downloadCsv(button) {
+    var table = button.closest('div[id$="_wrapper"]').querySelector('table');
+    var csv = Array.from(table.rows).map(function (row) {
+        return Array.from(row.cells).map(function (cell) {
+            return '"' + cell.textContent.replace(/"/g, '""') + '"';
+        }).join(',');
+    }).join('\\n');
+    var link = document.createElement('a');
+    link.href = URL.createObjectURL(new Blob([csv], {type: 'text/csv'}));
+    link.download = table.id + '.csv';
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+}
+"""
+
+GOALIE_COLUMNS = ['Player', 'TOI', 'Shots Against', 'Saves', 'Goals Against', 'SV%', 'GAA',
+                  'GSAA', 'xG Against', 'HD Shots Against', 'HD Saves', 'HD Goals Against']
+
+
+def make_games_page(year: int, games: int = 1312, first_game_id: int = 20001) -> str:
+    """
+    Returns a games.php page listing a season's worth of games.
+    """
+    rows = ''.join(
+        f'<tr><td>{year}-10-{1 + i % 28:02d} - Team A @ Team B</td>'
+        f'<td><a href="game.php?season={year}{year+1}&game={game_id}&view=limited">'
+        'Limited Report</a></td>'
+        f'<td><a href="game.php?season={year}{year+1}&game={game_id}">Full Report</a></td></tr>'
+        for i, game_id in enumerate(range(first_game_id, first_game_id + games)))
+    return f'<html><body><table id="games"><tbody>{rows}</tbody></table></body></html>'
+
+
+def make_table(table_id: str, columns: list[str], rows: int, rng: random.Random) -> str:
+    """
+    Returns a stat table with a leading unnamed row number column and a CSV button, as on NST.
+    """
+    header = ''.join(f'<th>{column}</th>' for column in [''] + columns)
+    body = ''.join(
+        '<tr>' + f'<td>{row + 1}</td><td>Player {row}</td>' +
+        ''.join(f'<td>{rng.randint(0, 30)}</td>' for _ in columns[1:]) + '</tr>'
+        for row in range(rows))
+    button = '<div class="dt-buttons"><button class="dt-button buttons-csv buttons-html5" '\
+             'onclick="downloadCsv(this)"><span>CSV</span></button></div>'
+    return f'<div id="{table_id}_wrapper">{button}<table id="{table_id}"><thead><tr>{header}'\
+           f'</tr></thead><tbody>{body}</tbody></table></div>'
+
+
+def make_game_report(away: str = 'Toronto Maple Leafs', home: str = 'Boston Bruins',
+                     away_code: str = 'TOR', home_code: str = 'BOS',
+                     game_date: str = '2024-10-09') -> str:
+    """
+    Returns a limited game report with every table the game scraper reads.
+    """
+    rng = random.Random(0)
+    sections = []
+    for team in [away_code, home_code]:
+        for table in ['st', 'oi']:
+            labels = ''.join(f'<label>{state.upper()}</label>' for state in GAME_STATES)
+            tables = ''.join(make_table(f'tb{team}{table}{state}', SKATER_COLUMNS, 20, rng)
+                             for state in GAME_STATES)
+            if table == 'st':
+                tables += make_table(f'tb{team}stgall', GOALIE_COLUMNS, 2, rng)
+            sections.append(f'<div><label id="{team}{table}lb">{team} {table}</label>'
+                            f'<div>{labels}</div>{tables}</div>')
+
+    # The scraper reads the title and date from //div[1]/div[5]/div/center
+    return f'<html><head><script>{DOWNLOAD_CSV_JS}</script></head>'\
+           '<body><div><div></div><div></div><div></div><div></div>'\
+           f'<div><div><center><h1>{away} @ {home}</h1><h2>{game_date}<br>Arena</h2>'\
+           f'</center></div></div>{"".join(sections)}</div></body></html>'
+
+
+def make_schedule_page(completed: int = 81, games: int = 162) -> str:
+    """
+    Returns a baseball-reference schedule page, where completed games have 21 <td> cells and
+    upcoming ones have fewer.
+    """
+    rng = random.Random(0)
+    rows = ['<tr><th>Gm#</th>' + ''.join(f'<th>c{i}</th>' for i in range(21)) + '</tr>']
+    for game in range(1, games + 1):
+        if game <= completed:
+            cells = ['Date', 'boxscore', 'TOR', '', 'BOS', 'W', str(rng.randint(0, 12)),
+                     str(rng.randint(0, 12))] + ['x'] * 13
+        else:
+            cells = ['Date', 'preview', 'TOR', '', 'BOS']
+        rows.append(f'<tr><th>{game}</th>' + ''.join(f'<td>{cell}</td>' for cell in cells) +
+                    '</tr>')
+    return f'<html><body><div id="all_team_schedule"><table>{"".join(rows)}</table></div>'\
+           '</body></html>'
+
+
+def load_fixture(name: str, default) -> str:
+    """
+    Returns the recorded page saved as name in FIXTURES_DIR if there is one, and otherwise
+    builds the stand-in page with default().
+    """
+    path = os.path.join(FIXTURES_DIR, name)
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            return f.read()
+    return default()
@@ -0,0 +1,301 @@
+"""
+Offline benchmark suite for the scrapers.
+
+Serves stand-in (or recorded) pages for NST and baseball-reference from a local HTTP server,
+points the scrapers at it, and measures the wall time, time per table, peak RSS, number of
+browser round trips and number of HTTP requests of each stage. Each benchmark runs in its own
+process so that its peak RSS isn't affected by the others.
+
+Results are written as JSON, tagged with the current commit, so that runs can be compared
+between commits, e.g.
+
+    python benchmarks/run_benchmarks.py -o bench_results.json
+    python benchmarks/run_benchmarks.py --selenium -o bench_results.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import resource
+import tempfile
+import threading
+import subprocess
+import statistics
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, 'scraping'),
+                os.path.join(REPO_DIR, 'scraping', 'baseball'), BENCHMARKS_DIR]
+
+from fixtures import load_fixture, make_game_report, make_games_page, make_schedule_page
+
+
+YEAR = 2024
+
+HTTP_BENCHMARKS = ['check_for_new_games_http', 'get_game_tables_http']
+SELENIUM_BENCHMARKS = ['check_for_new_games_selenium', 'get_game_tables',
+                       'get_game_tables_single_load', 'get_team_table']
+
+
+class FixtureServer:
+    """
+    Local HTTP server standing in for NST and baseball-reference, which counts the requests it
+    serves.
+    """
+
+    def __init__(self):
+        pages = {
+            '/games.php': load_fixture('games.php', lambda: make_games_page(YEAR)),
+            '/game.php': load_fixture('game.php', make_game_report),
+            '/teams': load_fixture('schedule.shtml', make_schedule_page),
+        }
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                page = pages.get(path) or pages.get('/' + path.split('/')[1])
+                with server.lock:
+                    server.requests += 1
+                if page is None:
+                    self.send_error(404)
+                    return
+                body = page.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def take_requests(self):
+        """
+        Returns the number of requests served since the last call.
+        """
+        with self.lock:
+            requests, self.requests = self.requests, 0
+        return requests
+
+
+def count_round_trips(driver):
+    """
+    Wraps the driver so that every WebDriver command it sends is counted, including those sent
+    through its elements. Returns a function giving the count so far.
+    """
+    count = [0]
+    execute = driver.execute
+
+    def counting_execute(driver_command, params=None):
+        count[0] += 1
+        return execute(driver_command, params)
+
+    driver.execute = counting_execute
+    return lambda: count[0]
+
+
+def bench_check_for_new_games_http(work_dir):
+    from check_for_new_games import find_new_games
+    from util.fetch import HttpBackend
+
+    backend = HttpBackend()
+    try:
+        start = time.perf_counter()
+        find_new_games(backend, YEAR, -1, index_path=os.path.join(work_dir, 'index.duckdb'),
+                       offline=True)
+        return {'wall_seconds': time.perf_counter() - start}
+    finally:
+        backend.close()
+
+
+def bench_check_for_new_games_selenium(work_dir):
+    from check_for_new_games import find_new_games
+    from scrape_game_data import create_driver
+    from util.fetch import SeleniumBackend
+
+    backend = SeleniumBackend(create_driver())
+    round_trips = count_round_trips(backend.driver)
+    try:
+        start = time.perf_counter()
+        find_new_games(backend, YEAR, -1, index_path=os.path.join(work_dir, 'index.duckdb'),
+                       offline=True)
+        return {'wall_seconds': time.perf_counter() - start,
+                'browser_round_trips': round_trips()}
+    finally:
+        backend.close()
+
+
+def bench_get_game_tables_http(work_dir):
+    from scrape_game_data import get_game_tables_http
+    from util.fetch import HttpBackend
+
+    os.makedirs('tables', exist_ok=True)
+    backend = HttpBackend()
+    try:
+        start = time.perf_counter()
+        get_game_tables_http(backend, YEAR, 20001)
+        return {'wall_seconds': time.perf_counter() - start, 'tables': count_tables()}
+    finally:
+        backend.close()
+
+
+def bench_get_game_tables(work_dir):
+    from scrape_game_data import create_driver, get_game_tables
+
+    os.makedirs('tables', exist_ok=True)
+    download_dir = os.path.join(work_dir, 'downloads')
+    os.makedirs(download_dir, exist_ok=True)
+    driver = create_driver(download_dir=download_dir)
+    round_trips = count_round_trips(driver)
+    try:
+        start = time.perf_counter()
+        get_game_tables(driver, YEAR, 20001, download_dir=download_dir)
+        return {'wall_seconds': time.perf_counter() - start, 'tables': count_tables(),
+                'browser_round_trips': round_trips()}
+    finally:
+        driver.quit()
+
+
+def bench_get_game_tables_single_load(work_dir):
+    from scrape_game_data import create_driver, get_game_tables_single_load
+
+    os.makedirs('tables', exist_ok=True)
+    driver = create_driver()
+    round_trips = count_round_trips(driver)
+    try:
+        start = time.perf_counter()
+        get_game_tables_single_load(driver, YEAR, 20001)
+        return {'wall_seconds': time.perf_counter() - start, 'tables': count_tables(),
+                'browser_round_trips': round_trips()}
+    finally:
+        driver.quit()
+
+
+def bench_get_team_table(work_dir):
+    from scrape_game_data import create_driver
+    from scrape_team_record import get_team_table
+
+    driver = create_driver()
+    round_trips = count_round_trips(driver)
+    try:
+        start = time.perf_counter()
+        get_team_table(driver, YEAR, ['TOR', 'BOS', 'NYY', 'TBR', 'BAL'])
+        return {'wall_seconds': time.perf_counter() - start, 'tables': 5,
+                'browser_round_trips': round_trips()}
+    finally:
+        driver.quit()
+
+
+def count_tables():
+    return len([name for name in os.listdir('tables') if name.endswith('.csv')])
+
+
+def run_one(name):
+    """
+    Runs a single benchmark in this process and prints its result as JSON. Called in a
+    subprocess by run_all.
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        os.chdir(work_dir)
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                result = globals()[f'bench_{name}'](work_dir)
+            finally:
+                sys.stdout = stdout
+
+    # ru_maxrss is in kilobytes on Linux. Chrome and chromedriver are counted as children.
+    result['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    result['peak_child_rss_mb'] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    print(json.dumps(result))
+
+
+def run_all(names, repeat):
+    """
+    Runs every benchmark `repeat` times against the fixture server, and returns the median of
+    each of their measurements.
+    """
+    results = {}
+    with FixtureServer() as server:
+        env = {**os.environ, 'NST_BASE_URL': server.url, 'BBREF_BASE_URL': server.url,
+               'PYTHONPATH': REPO_DIR}
+        # Every run has to fetch its pages, rather than read them from the page cache
+        env.pop('SCRAPER_PAGE_CACHE_DIR', None)
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                output = subprocess.run([sys.executable, os.path.abspath(__file__), '--run', name],
+                                        env=env, capture_output=True, text=True, check=True)
+                run = json.loads(output.stdout.strip().splitlines()[-1])
+                run['http_requests'] = server.take_requests()
+                runs.append(run)
+
+            result = {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+            if result.get('tables'):
+                result['seconds_per_table'] = result['wall_seconds'] / result['tables']
+            result['runs'] = repeat
+            results[name] = result
+            print(f"{name}: {json.dumps(result)}")
+
+    return results
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(output, repeat, selenium):
+    names = HTTP_BENCHMARKS + (SELENIUM_BENCHMARKS if selenium else [])
+    report = {
+        'commit': get_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'results': run_all(names, repeat),
+    }
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote results to {output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-o', '--output', default='bench_results.json',
+                        help='JSON file to write the results to.')
+    parser.add_argument('-n', '--repeat', default=3, type=int,
+                        help='Number of times to run each benchmark. The median is reported.')
+    parser.add_argument('--selenium', action='store_true',
+                        help='Also run the benchmarks that need Chrome.')
+    parser.add_argument('--run', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_one(args.run)
+    else:
+        main(args.output, args.repeat, args.selenium)
@@ -0,0 +1,127 @@
+"""
+Single entry point for the scraping jobs, e.g.
+
+    python -m scraping discover --state --batch
+    python -m scraping scrape-game -b http --game_ids 20001 20002
+
+Each subcommand runs the script of its job with the rest of the arguments, the same as running
+the script directly, and imports nothing but what that script does. The scripts themselves only
+import selenium, duckdb and the like on the code paths that use them, so a short job such as a
+check that finds no new games doesn't pay for them.
+
+--import_times runs the job under python -X importtime and reports how long its imports took per
+package, and with --import_budget, fails if they took longer than the budget.
+"""
+
+import os
+import sys
+import runpy
+import argparse
+import subprocess
+
+
+SCRAPING_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Subcommand -> script it runs, relative to this directory, and what it does
+COMMANDS = {
+    'discover': ('check_for_new_games.py', "Find games on NST that haven't been scraped yet."),
+    'scrape-game': ('scrape_game_data.py', 'Scrape the tables of one or more games.'),
+    'game-ids': ('get_all_game_ids.py', 'List every game ID of a season, or build a backlog.'),
+    'team-tables': ('scrape_team_tables.py', 'Download the team tables.'),
+    'mlb-records': (os.path.join('baseball', 'scrape_team_record.py'),
+                    'Scrape the MLB team records from baseball-reference.'),
+    'ingest': ('ingest_game_tables.py', 'Load scraped game tables into the DB.'),
+    'worker': ('scrape_worker.py', 'Scrape games from a backlog or the work queue.'),
+}
+
+# Number of packages listed in the import time report
+REPORT_TOP = 15
+
+
+def run_command(command, args):
+    """
+    Runs the script of the subcommand as __main__ with the given arguments.
+    """
+    path = os.path.join(SCRAPING_DIR, COMMANDS[command][0])
+
+    # Same as running the script directly, its own directory goes first on the path, so it can
+    # import the scripts next to it. The repo root is needed for util.
+    sys.path[:0] = [os.path.dirname(path), os.path.dirname(SCRAPING_DIR)]
+    sys.argv = [path, *args]
+    runpy.run_path(path, run_name='__main__')
+
+
+def parse_import_times(lines):
+    """
+    Sums the self time of every import in the output of python -X importtime by top-level
+    package, e.g. every selenium.* module under selenium.
+    :return dict: Package -> microseconds spent importing it.
+    """
+    totals = {}
+    for line in lines:
+        _, self_us, _, name = [part.strip() for part in line.replace('|', ':', 2).split(':', 3)]
+        if not self_us.isdigit():
+            # Header line
+            continue
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + int(self_us)
+    return totals
+
+
+def report_import_times(argv, budget_ms=None):
+    """
+    Runs this entry point again with the same arguments under python -X importtime, and prints
+    how long the imports took, largest packages first.
+    :return int: Exit code of the job, or 1 if it succeeded but its imports went over budget_ms.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', os.path.abspath(__file__),
+                             *argv], stderr=subprocess.PIPE, text=True, check=False)
+
+    import_lines = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:'):
+            import_lines.append(line)
+        else:
+            print(line, file=sys.stderr)
+
+    totals = parse_import_times(import_lines)
+    total_ms = sum(totals.values()) / 1000
+
+    print(f"\nImport times for {' '.join(argv)}:", file=sys.stderr)
+    print(f"{'package':<30} {'ms':>8}", file=sys.stderr)
+    for package, us in sorted(totals.items(), key=lambda item: -item[1])[:REPORT_TOP]:
+        print(f"{package:<30} {us / 1000:>8.1f}", file=sys.stderr)
+    print(f"{'total':<30} {total_ms:>8.1f}", file=sys.stderr)
+
+    if budget_ms is not None and total_ms > budget_ms:
+        print(f"Imports took {total_ms:.1f} ms, over the budget of {budget_ms:.1f} ms",
+              file=sys.stderr)
+        return result.returncode or 1
+    return result.returncode
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog='python -m scraping',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog='commands:\n' + '\n'.join(f'  {command:<14}{description}'
+                                         for command, (_, description) in COMMANDS.items()))
+    parser.add_argument('--import_times', action='store_true',
+                        help='Report how long the imports of the job took, per package.')
+    parser.add_argument('--import_budget', default=None, type=float, metavar='MS',
+                        help='With --import_times, exit with an error if the imports took '\
+                             'longer than this many milliseconds.')
+    parser.add_argument('command', choices=COMMANDS, metavar='command',
+                        help='Job to run, see below. Run "<command> --help" for its arguments.')
+    parser.add_argument('args', nargs=argparse.REMAINDER,
+                        help='Arguments of the job.')
+    args = parser.parse_args()
+
+    if args.import_times:
+        sys.exit(report_import_times([args.command, *args.args], args.import_budget))
+
+    run_command(args.command, args.args)
+
+
+if __name__ == '__main__':
+    main()
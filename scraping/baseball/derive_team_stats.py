@@ -0,0 +1,168 @@
+"""
+Script that precomputes derived stats from the per-game runs for/against in the team records
+written by scrape_team_record.py, so that consumers can read them instead of recomputing them.
+scrape_team_record.py runs it after every scrape, and it can also be run on its own.
+
+For each season, team and game this adds the cumulative record, run differential, rolling N-game windows
+and Pythagorean expectation, computed in one vectorized pass per team with Polars. The result is
+written as Parquet next to the records CSV. When it already exists, only the teams with newly
+appended games are recomputed.
+
+The records hold baseball-reference's team codes, e.g. KCR, so the canonical team_id and the
+franchise of each team are joined on from the team dimension in util.team_maps.
+"""
+
+import os
+import argparse
+
+import polars as pl
+
+from util.team_maps import mlb_team_columns, mlb_teams
+
+# Columns added to the stats from the team dimension
+TEAM_COLUMNS = ('team_id', 'franchise')
+
+# Columns the stats are accumulated over. Records written before the year column was added only
+# hold a single season, and are accumulated by team alone.
+SEASON_KEYS = ('year', 'team')
+
+# Exponent for the Pythagorean expectation, as used by baseball-reference
+PYTHAG_EXPONENT = 1.83
+
+
+def season_keys(frame: pl.DataFrame) -> list[str]:
+    """
+    Returns the columns of SEASON_KEYS that the frame has.
+    """
+    return [name for name in SEASON_KEYS if name in frame.columns]
+
+
+def derive_stats(records: pl.DataFrame, window: int = 10) -> pl.DataFrame:
+    """
+    Computes the derived stats for every game in the records.
+
+    :param pl.DataFrame records: Columns year, team, game_number, runs_for and runs_against.
+    :param int window: Number of games in the rolling windows.
+    :return pl.DataFrame: The records with the derived columns added, sorted by season, team and
+                          game.
+    """
+    keys = season_keys(records)
+    cum_runs_for = pl.col('runs_for').cum_sum().over(keys)
+    cum_runs_against = pl.col('runs_against').cum_sum().over(keys)
+
+    return (
+        records
+        .sort(*keys, 'game_number')
+        .with_columns(
+            win=(pl.col('runs_for') > pl.col('runs_against')).cast(pl.Int32),
+            run_diff=pl.col('runs_for') - pl.col('runs_against'),
+        )
+        .with_columns(
+            wins=pl.col('win').cum_sum().over(keys),
+            losses=(1 - pl.col('win')).cum_sum().over(keys),
+            cum_runs_for=cum_runs_for,
+            cum_runs_against=cum_runs_against,
+            cum_run_diff=pl.col('run_diff').cum_sum().over(keys),
+            rolling_wins=pl.col('win').rolling_sum(window, min_samples=1).over(keys),
+            rolling_run_diff=pl.col('run_diff').rolling_sum(window, min_samples=1).over(keys),
+            pythag_pct=cum_runs_for.pow(PYTHAG_EXPONENT) / (
+                cum_runs_for.pow(PYTHAG_EXPONENT) + cum_runs_against.pow(PYTHAG_EXPONENT)),
+        )
+        .with_columns(
+            win_pct=pl.col('wins') / pl.col('game_number'),
+            pythag_wins=pl.col('pythag_pct') * pl.col('game_number'),
+        )
+    )
+
+
+def team_dimension() -> pl.DataFrame:
+    """
+    Returns the MLB teams of util.team_maps as a DataFrame, one row per team.
+    """
+    return pl.DataFrame(mlb_teams, schema=list(mlb_team_columns), orient='row')
+
+
+def add_team_columns(stats: pl.DataFrame) -> pl.DataFrame:
+    """
+    Adds the team_id and franchise of the baseball-reference team code in each row, as enums of
+    every team_id right after the team column, replacing them if the stats already have them.
+    """
+    dimension = team_dimension()
+    team_ids = pl.Enum(sorted(dimension['team_id']))
+    dimension = dimension.select(
+        pl.col('bbref').alias('team'), *[pl.col(name).cast(team_ids) for name in TEAM_COLUMNS])
+    joined = stats.drop(TEAM_COLUMNS, strict=False).join(dimension, on='team', how='left',
+                                                         maintain_order='left')
+
+    unknown = joined.filter(pl.col('team_id').is_null())['team'].unique().sort().to_list()
+    if unknown:
+        raise ValueError(f"Unknown baseball-reference team codes {unknown}, add them to "\
+                         f"util.team_maps")
+
+    position = joined.columns.index('team') + 1
+    others = [name for name in joined.columns if name not in TEAM_COLUMNS]
+    return joined.select(*others[:position], *TEAM_COLUMNS, *others[position:])
+
+
+def update_stats(records: pl.DataFrame, existing: pl.DataFrame, window: int = 10) -> pl.DataFrame:
+    """
+    Recomputes the derived stats only for the seasons of teams that have games in the records
+    which aren't in the existing stats yet, keeping the rest as they are. If the existing stats
+    aren't keyed the same way as the records, e.g. from before the year column, every team is
+    recomputed.
+    """
+    keys = season_keys(records)
+    if season_keys(existing) != keys:
+        print("The existing stats are keyed differently from the records, recomputing them all")
+        return derive_stats(records, window)
+
+    new_games = records.join(existing.select(*keys, 'game_number'), on=[*keys, 'game_number'],
+                             how='anti')
+    changed = new_games.select(keys).unique()
+    print(f"Found {new_games.height} new games for {changed.height} teams")
+
+    if changed.is_empty():
+        return existing
+
+    recomputed = derive_stats(records.join(changed, on=keys, how='semi'), window)
+    kept = existing.join(changed, on=keys, how='anti').drop(TEAM_COLUMNS, strict=False)
+
+    return pl.concat([kept, recomputed], how='diagonal_relaxed').sort(*keys, 'game_number')
+
+
+def main(records_path: str, output_path: str | None = None, window: int = 10,
+         full: bool = False):
+    """
+    Writes the derived stats for the records file as Parquet, updating the existing output
+    incrementally unless full is set.
+    """
+    if output_path is None:
+        output_path = os.path.join(os.path.dirname(records_path), 'team_records_derived.parquet')
+
+    records = pl.read_csv(records_path, schema_overrides={
+        'game_number': pl.Int64, 'runs_for': pl.Int64, 'runs_against': pl.Int64})
+
+    if not full and os.path.exists(output_path):
+        stats = update_stats(records, pl.read_parquet(output_path), window)
+    else:
+        stats = derive_stats(records, window)
+
+    stats = add_team_columns(stats)
+    stats.write_parquet(output_path)
+    print(f"Wrote {stats.height} rows to {output_path}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--records', default='team_records.csv',
+                        help='CSV of per-game runs for/against written by scrape_team_record.py.')
+    parser.add_argument('-o', '--output', default=None,
+                        help='Parquet file to write. Defaults to team_records_derived.parquet '\
+                             'next to the records.')
+    parser.add_argument('-w', '--window', default=10, type=int,
+                        help='Number of games in the rolling windows.')
+    parser.add_argument('--full', action='store_true',
+                        help='Recompute every team instead of only those with new games.')
+    args = parser.parse_args()
+
+    main(args.records, args.output, args.window, args.full)
@@ -2,128 +2,249 @@
 Script that uses Selenium to scrape a table of every result in a team's schedule from baseball
 reference.
 
-Saves the output as a CSV file.
+Saves the output as a CSV file, with the season of each game in its year column. Either a single
+division or all 30 teams can be scraped, and in incremental mode only games beyond the ones
+already in the file for the same season and team are added to it.
+
+Once written, the derived stats are updated from the records with derive_team_stats.py, unless
+--no_derive is set, in which case it can be run on its own later.
 """
 
 import os
 import time
 import argparse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 
+from util.driver import create_driver
+from util.instrument import finish, span
+from util.rate_limit import call_with_retries, get_default_limiter
+from util.waits import wait_for_element, wait_for_page_ready
+
+
+# Reads every row of the schedule table in one call, rather than one WebDriver round trip per
+# cell. The header row is skipped, and only the <td> cells of each row are kept, since the game
+# number in the first column is a <th>.
+SCHEDULE_ROWS_JS = """
+const table = document.getElementById('all_team_schedule').querySelector('table');
+return Array.from(table.querySelectorAll('tr')).slice(1).map(
+    row => Array.from(row.querySelectorAll('td'), cell => cell.textContent.trim()));
+"""
+
+# Overridable so the scraper can be pointed at a local server serving saved pages
+BBREF_BASE_URL = os.environ.get('BBREF_BASE_URL',
+                                'https://www.baseball-reference.com').rstrip('/')
+
+DIVISIONS = {
+    0: ['TOR', 'BOS', 'NYY', 'TBR', 'BAL'],
+    1: ['SEA', 'HOU', 'LAA', 'TEX', 'ATH'],
+    2: ['CLE', 'DET', 'KCR', 'MIN', 'CHW'],
+    3: ['MIA', 'WSN', 'ATL', 'NYM', 'PHI'],
+    4: ['SDP', 'COL', 'SFG', 'LAD', 'ARI'],
+    5: ['STL', 'MIL', 'CHC', 'CIN', 'PIT']
+}
 
-def get_team_table(driver: webdriver, year: int, teams: list[str]) -> None:
+
+def get_team_table(driver: webdriver, year: int, teams: list[str]) -> pd.DataFrame:
     """
     For each team in the division, open the baseball-reference page and scrape scoring
     data for each game.
     """
-    # Store the data in lists
-    teams_col = []
-    game_num = []
-    runs_for = []
-    runs_against = []
+    frames = []
+    limiter = get_default_limiter()
 
     for team in teams:
-        url = f'https://www.baseball-reference.com/teams/{team}/{year}-schedule-scores.shtml'
+        url = f'{BBREF_BASE_URL}/teams/{team}/{year}-schedule-scores.shtml'
         print(f"Accessing {url}...")
-        driver.get(url)
-        time.sleep(3)
+        with span('rate_limit_wait', team=team):
+            limiter.wait(url)
 
-        table = driver.find_element(By.ID, 'all_team_schedule').find_element(By.TAG_NAME, 'table')
+        start = time.monotonic()
+        with span('page_load', team=team):
+            try:
+                driver.get(url)
+                wait_for_page_ready(driver)
+                wait_for_element(driver, By.CSS_SELECTOR, '#all_team_schedule table')
+            except Exception:
+                limiter.record(url, error=True)
+                raise
+        limiter.record(url, time.monotonic() - start)
 
-        # First row is headers, take from first row onwards
-        rows = table.find_elements(By.TAG_NAME, 'tr')[1:]
+        with span('extract_table', team=team):
+            rows = driver.execute_script(SCHEDULE_ROWS_JS)
+            frames.append(parse_schedule_rows(team, rows, year))
 
-        # Maintain count of consecutive empty rows, once streak hits 3 then we've got everything
-        # we need from completed games, so exit loop
-        empty_streak = 0
+    return pd.concat(frames, ignore_index=True)
 
-        game_number = 1
-        for row in rows:
-            if empty_streak > 2:
-                break
 
-            cells = row.find_elements(By.TAG_NAME, 'td')
+def parse_schedule_rows(team: str, rows: list[list[str]], year: int) -> pd.DataFrame:
+    """
+    Turns the cells of a team's schedule table into a DataFrame of runs for/against for each
+    completed game. A game without runs, e.g. one that was suspended or forfeited, is kept with
+    null runs, so the games after it keep their game numbers.
+
+    :param str team: Team the schedule belongs to.
+    :param list rows: Text of the <td> cells of each row in the table, header row excluded.
+    :param int year: Season of the schedule.
+    :return pd.DataFrame: Columns year, team, game_number, runs_for and runs_against.
+    """
+    runs_for = []
+    runs_against = []
 
-            # Rows containing data for completed games will have 21 cells
-            if len(cells) < 21:
-                empty_streak += 1
-                continue
+    # Maintain count of consecutive empty rows, once streak hits 3 then we've got everything
+    # we need from completed games, so exit loop
+    empty_streak = 0
 
-            empty_streak = 0
-            teams_col.append(team)
-            game_num.append(game_number)
-            runs_for.append(cells[6].text)
-            runs_against.append(cells[7].text)
+    for cells in rows:
+        if empty_streak > 2:
+            break
 
-            game_number += 1
+        # Rows containing data for completed games will have 21 cells
+        if len(cells) < 21:
+            empty_streak += 1
+            continue
 
-    # Load data into a DataFrame and write to a csv
-    df = pd.DataFrame({
-        'team': teams_col,
-        'game_number': game_num,
-        'runs_for': runs_for,
-        'runs_against': runs_against
+        empty_streak = 0
+        runs_for.append(cells[6])
+        runs_against.append(cells[7])
+
+    return pd.DataFrame({
+        'year': pd.Series([year] * len(runs_for), dtype='int64'),
+        'team': team,
+        'game_number': pd.Series(range(1, len(runs_for) + 1), dtype='int64'),
+        'runs_for': pd.to_numeric(pd.Series(runs_for, dtype=object), errors='coerce')
+                      .astype('Int64'),
+        'runs_against': pd.to_numeric(pd.Series(runs_against, dtype=object), errors='coerce')
+                          .astype('Int64'),
     })
 
-    df.to_csv('team_records.csv', index=False)
+
+def scrape_teams(year: int, teams: list[str]) -> pd.DataFrame:
+    """
+    Scrapes the schedules of the given teams with a single Chrome instance, retrying up to 3
+    times on failure.
+    """
+    def attempt(number):
+        driver = create_driver(extra_arguments=['--ignore-certificate-errors',
+                                                '--disable-dev-shm-usage'])
+        try:
+            #driver.command_executor.set_timeout(250)
+            print(f"Getting game tables for {teams}, attempt {number}...")
+            return get_team_table(driver, year, teams)
+        finally:
+            driver.quit()
+
+    return call_with_retries(attempt, label=f'Getting game tables for {teams}')
 
 
-def main(year: int, division: int):
+def scrape_teams_parallel(year: int, teams: list[str], workers: int) -> pd.DataFrame:
+    """
+    Splits the teams between `workers` Chrome instances running at once, and scrapes their
+    schedules.
+    """
+    workers = max(1, min(workers, len(teams)))
+    chunks = [teams[i::workers] for i in range(workers)]
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(lambda chunk: scrape_teams(year, chunk), chunks))
+
+    return pd.concat(frames, ignore_index=True)
+
+
+def merge_records(existing: pd.DataFrame, scraped: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds the games in `scraped` with a game_number beyond the last one stored for their season
+    and team in `existing`, returning one deduplicated table sorted by season, team and game.
+    Stored games without runs are replaced by their scraped rows, in case they have been played
+    since.
+    """
+    if 'year' not in existing.columns:
+        raise ValueError("The stored records have no year column, so which season they are "\
+                         "from is unknown. Scrape them again without --incremental.")
+
+    keys = ['year', 'team']
+    stored_up_to = existing.groupby(keys, as_index=False)['game_number'].max()
+    stored_up_to = scraped[keys].merge(stored_up_to, on=keys, how='left')['game_number']
+    is_new = scraped['game_number'].to_numpy() > stored_up_to.fillna(0).to_numpy()
+
+    without_runs = existing[existing[['runs_for', 'runs_against']].isna().any(axis=1)]
+    is_unplayed = scraped[[*keys, 'game_number']].merge(
+        without_runs[[*keys, 'game_number']], on=[*keys, 'game_number'], how='left',
+        indicator=True)['_merge'].eq('both').to_numpy()
+
+    new_games = scraped[is_new | is_unplayed]
+    print(f"Adding {is_new.sum()} new games to {len(existing)} stored, and updating "\
+          f"{is_unplayed.sum()} stored without runs")
+
+    merged = pd.concat([existing, new_games], ignore_index=True)
+    merged = merged.drop_duplicates(subset=[*keys, 'game_number'], keep='last')
+    merged = merged.astype({'runs_for': 'Int64', 'runs_against': 'Int64'})
+    return merged.sort_values([*keys, 'game_number'], ignore_index=True)
+
+
+def main(year: int, division: int | None = None, all_teams: bool = False,
+         incremental: bool = False, workers: int = 3, output: str = 'team_records.csv',
+         derive: bool = True):
     """
     Given a year and division marker, scrape game-by-game runs for/against for each team in that
     division.
 
-    :param year: _description_
-    :param division: _description_
-    :raises e: _description_
+    :param year: Season to scrape.
+    :param division: Key of the division in DIVISIONS to scrape.
+    :param all_teams: Scrape every team in every division instead of a single division.
+    :param incremental: Only add games beyond the ones already in the output file to it, rather
+                        than rewriting it from scratch.
+    :param workers: With all_teams, the number of Chrome instances to scrape with at once.
+    :param output: CSV file to write the records to.
+    :param derive: Update the derived stats next to the output, see derive_team_stats.py. They
+                   are only recomputed for the teams with new games in incremental mode.
     """
 
-    teams = {
-        0: ['TOR', 'BOS', 'NYY', 'TBR', 'BAL'],
-        1: ['SEA', 'HOU', 'LAA', 'TEX', 'ATH'],
-        2: ['CLE', 'DET', 'KCR', 'MIN', 'CHW'],
-        3: ['MIA', 'WSN', 'ATL', 'NYM', 'PHI'],
-        4: ['SDP', 'COL', 'SFG', 'LAD', 'ARI'],
-        5: ['STL', 'MIL', 'CHC', 'CIN', 'PIT']
-    }
-
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--ignore-certificate-errors')
-    chrome_options.add_argument('--headless')
-    chrome_options.add_argument('--disable-dev-shm-usage')
-
-    retries = 3
-    while retries > 0:
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            #driver.command_executor.set_timeout(250)
-            print(f"Getting game tables, attempt {4 - retries}...")
-            time.sleep(2)
+    if all_teams:
+        teams = [team for division_teams in DIVISIONS.values() for team in division_teams]
+        df = scrape_teams_parallel(year, teams, workers)
+    else:
+        df = scrape_teams(year, DIVISIONS[division])
 
-            get_team_table(driver, year, teams[division])
-        except Exception as e:
-            retries -= 1
-            driver.quit()
-            if retries == 0:
-                raise e
-        else:
-            driver.quit()
-            break
+    if incremental and os.path.exists(output):
+        df = merge_records(pd.read_csv(output), df)
+
+    df.to_csv(output, index=False)
+
+    if derive:
+        # Next to this script, imported here so that --no_derive doesn't need polars
+        import derive_team_stats
+
+        with span('derive_stats'):
+            derive_team_stats.main(output, full=not incremental)
 
     print("Scrape complete")
+    finish('scrape_team_record')
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-y', '--year', default=datetime.now().year, type=int,
                         help='Year corresponding to season for which to scrape games.')
-    parser.add_argument('-d', '--division', required=True, type=int,
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('-d', '--division', type=int, choices=DIVISIONS,
                        help='Integer between 0 and 6, corresponding to each division.')
+    group.add_argument('-a', '--all', action='store_true',
+                       help='Scrape all 30 teams.')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='Only add games beyond the ones already stored in the output file.')
+    parser.add_argument('-w', '--workers', default=3, type=int,
+                        help='With --all, number of Chrome instances to scrape with at once.')
+    parser.add_argument('-o', '--output', default='team_records.csv',
+                        help='CSV file to write the records to.')
+    parser.add_argument('--no_derive', action='store_true',
+                        help="Don't update the derived stats from the records afterwards.")
     args = parser.parse_args()
 
-    main(year=args.year, division=args.division)
+    main(year=args.year, division=args.division, all_teams=args.all,
+         incremental=args.incremental, workers=args.workers, output=args.output,
+         derive=not args.no_derive)
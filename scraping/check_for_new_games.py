@@ -7,90 +7,159 @@ that to the games available on NST, and if a new one was found, set that game ID
 for the next scraping step.
 
 If not, exit gracefully and end the workflow.
+
+Since most scheduled runs find nothing, --state first checks whether the games listing has
+changed at all since the last run that found nothing new, and --schedule_aware skips polling
+outside of the hours when games finish, see util.change_detect. Both exit with game_id=NONE
+without starting Chrome or querying the DB.
+
+NST sometimes corrects games after the fact, which never shows up as a new ID. --revalidate
+instead outputs every game of the last few days that is already in the DB, to be scraped again
+with scrape_game_data.py --refresh and loaded with ingest_game_tables.py --upsert, which only
+replaces the tables whose content changed.
 """
 
 import os
-import time
+import json
 import argparse
-from datetime import datetime
-
-import duckdb
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-
-def check_for_new_games(driver, year, modulo):
+from datetime import date, datetime, timedelta
+
+from util.change_detect import DEFAULT_STATE_PATH, ListingState, fingerprint_listing, \
+    in_game_window
+from util.fetch import BACKENDS, get_backend
+from util.game_index import DEFAULT_INDEX_PATH, GameIndex
+from util.instrument import finish, span
+from util.nst import games_url, parse_game_id, parse_report_hrefs
+from util.rate_limit import call_with_retries
+from util.work_queue import DEFAULT_QUEUE_PATH, WorkQueue
+
+def check_for_new_games(backend, year, modulo, index_path=None, offline=False, force_sync=False):
     """
     Given a year, navigates to the 'Games' page of naturalstattrick.com for that season,
     and checks the list of game IDs against the `last_game_id`. If it
     finds one that hasn't been scraped, return that game ID. If no new game was found,
     return nothing.
     """
-    # Regular season
-    base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-               f'thruseason={year}{year+1}6&stype=2&sit=5v5&loc=B&team=All&rate=n'
+    new_game_ids = find_new_games(backend, year, modulo, limit=1, index_path=index_path,
+                                  offline=offline, force_sync=force_sync)
+
+    if not new_game_ids:
+        print("No new games found, exiting....")
+        return None
+
+    game_id = new_game_ids[0]
+    print(f"Found new game with ID {game_id}")
+    return game_id
 
-    # Playoffs
-    #base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-    #           f'thruseason={year}{year+1}&stype=3&sit=5v5&loc=B&team=All&rate=n'
 
-    # Pre-season
-    #base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-    #           f'thruseason={year}{year+1}&stype=1&sit=5v5&loc=B&team=All&rate=n'
+def find_new_games(backend, year, modulo, limit=None, index_path=None, offline=False,
+                   force_sync=False):
+    """
+    Given a year, navigates to the 'Games' page of naturalstattrick.com for that season and
+    returns every game ID on it that hasn't been scraped yet, in the order they are listed.
+
+    :param backend: Fetch backend used to load the page, see util.fetch.
+    :param int year: Season for which to check.
+    :param int modulo: If >= 0, only return game IDs where gameID % 5 == modulo.
+    :param int limit: If set, return at most this many game IDs.
+    :param str index_path: If set, check against the local game index at this path.
+    :param bool offline: Only use the local game index, without connecting to the DB.
+    :param bool force_sync: Read every game ID of the season into the local game index, even if
+                            it isn't stale.
+    :return list[int]: Game IDs that are on NST but not in the DB.
+    """
+    # Regular season, see util.nst.SEASON_TYPES for the playoffs and pre-season
+    base_url = games_url(year)
 
     print(f"Accessing {base_url}")
-    driver.get(base_url)
+    href_values = parse_report_hrefs(backend.get_page(base_url))
 
-    time.sleep(2)
+    # Keep the page order, dropping any game linked more than once
+    page_ids = list(dict.fromkeys(parse_game_id(value) for value in href_values))
 
-    report_elements = driver.find_elements(By.LINK_TEXT, "Limited Report")
-    href_values = [element.get_dom_attribute('href') for element in report_elements]
+    # For the playoffs, series reports links end in 0 while game report links end in 1
+    # We only want the game reports so skip if value % 0 == 0
+    #page_ids = [nst_game_id for nst_game_id in page_ids if nst_game_id % 10 != 0]
 
-    game_id = None
-    found = False
+    if modulo >= 0:
+        page_ids = [nst_game_id for nst_game_id in page_ids if nst_game_id % 5 == modulo]
 
-    reported_ids = get_existing_game_ids(year)
+    new_ids = set(page_ids) - get_existing_game_ids(year, page_ids, index_path, offline,
+                                                    force_sync)
+    new_game_ids = [nst_game_id for nst_game_id in page_ids if nst_game_id in new_ids]
 
-    for value in href_values:
-        nst_game_id = int(value.split('game=')[1].split('&view')[0])
+    if limit is not None:
+        new_game_ids = new_game_ids[:limit]
 
-        # For the playoffs, series reports links end in 0 while game report links end in 1
-        # We only want the game reports so skip if value % 0 == 0
-        #if nst_game_id % 10 == 0:
-        #    continue
+    return new_game_ids
 
-        if modulo >= 0 and nst_game_id % 5 != modulo:
-            continue
 
-        if nst_game_id not in set(reported_ids):
-            game_id = nst_game_id
-            found = True
-            break
+def get_existing_game_ids(year: int, candidates=None, index_path: str | None = None,
+                          offline: bool = False, force_sync: bool = False) -> set[int]:
+    """
+    Queries the database to get a set of all the game IDS already included.
 
-    if not found:
-        print("No new games found, exiting....")
-        return None
+    If index_path is set, the IDs are read from the local index at that path instead, after
+    syncing the games added since its last check from the database, or every game of the season
+    once its last full sync is older than its TTL, see util.game_index. Offline always reads from
+    the local index as is.
 
-    print(f"Found new game with ID {game_id}")
-    return game_id
+    :param int year: Season for which to check DB.
+    :param candidates: Game IDs that are going to be checked against the result.
+    :param str index_path: Path of the local game index to use.
+    :param bool offline: Read the local index as is, without connecting to the database.
+    :param bool force_sync: Read every game ID of the season into the local index, even if it
+                            isn't stale.
+    :return set[int]: Set of game report IDs.
+    """
+    if index_path is None and not offline:
+        # Imported here so that the checks that exit early don't pay for importing duckdb
+        import duckdb
+
+        with span('warehouse_query'):
+            conn = duckdb.connect(database='md:', read_only=True)
+            rows = conn.execute("SELECT DISTINCT gameID FROM skater_games WHERE season = ?",
+                                [year]).fetchall()
+            conn.close()
+
+        return {row[0] for row in rows}
 
+    with GameIndex(index_path or DEFAULT_INDEX_PATH) as index:
+        if not offline:
+            import duckdb
 
-def get_existing_game_ids(year: int) -> set[int]:
+            with span('index_sync'):
+                conn = duckdb.connect(database='md:', read_only=True)
+                index.sync(year, conn, candidates, full=force_sync or index.is_stale(year))
+                conn.close()
+
+        return index.get_ids(year)
+
+
+def get_recent_game_ids(year: int, days: int) -> list[int]:
     """
-    Queries the database to get a set of all the game IDS already included.
+    Queries the database for the IDs of the games of the season played in the last `days` days.
 
     :param int year: Season for which to check DB.
-    :return set[int]: Set of game report IDs.
+    :param int days: How many days back to go, counting today.
+    :return list[int]: Game IDs, in order.
     """
-    ids = {}
-    conn = duckdb.connect(database='md:', read_only=True)
+    import duckdb
 
-    ids = set(conn.sql(f"SELECT DISTINCT gameID FROM skater_games WHERE season = {year}").pl()['gameID'])
-    conn.close()
+    since = date.today() - timedelta(days=days)
+    with span('warehouse_query'):
+        conn = duckdb.connect(database='md:', read_only=True)
+        rows = conn.execute("SELECT DISTINCT gameID FROM skater_games "\
+                            "WHERE season = ? AND date >= ? ORDER BY gameID",
+                            [year, since]).fetchall()
+        conn.close()
 
-    return ids
+    return [row[0] for row in rows]
 
 
-def main(year, modulo):
+def main(year, modulo, backend_name='selenium', batch=False, max_games=None, index_path=None,
+         offline=False, queue_path=None, state_path=None, schedule_aware=False,
+         revalidate_days=None, force_sync=False):
     """
     Checks that a new game ID exists for that year and sets it as an output for subsequent
     step in workflow.
@@ -98,32 +167,89 @@ def main(year, modulo):
     If no new game ID exists, exit gracefully.
 
     If modulo is provided, this will only scrape gameIDs where gameID % 5 == modulo.
+
+    backend_name picks how the games page is fetched, see util.fetch.BACKENDS.
+
+    If batch is set, every new game ID (up to max_games of them) is set as a JSON array in the
+    `game_ids` output instead, to be used as the matrix for the scraping jobs.
+
+    If index_path is set, scraped IDs are read from a local index synced incrementally with the
+    DB, and in full once it is stale or if force_sync is set, or not synced at all if offline is
+    set.
+
+    If queue_path is set, every new game ID is also added to the work queue at that path, for any
+    number of scrape_worker.py --queue runners to drain. This implies batch.
+
+    If state_path is set, the games listing is first compared to its fingerprint from the last run
+    that found nothing new, saved at that path, and nothing else is done if it hasn't changed.
+    If schedule_aware is set, nothing is done outside of the hours when games finish.
+
+    If revalidate_days is set, the games already in the DB that were played in that many days are
+    set as the batch outputs instead, to be scraped again in case NST corrected them.
     """
 
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--headless')
-    retries = 3
-    while retries > 0:
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            print(f"Getting game IDs, attempt {4 - retries}...")
-            time.sleep(2)
-            game_id = check_for_new_games(driver, year, modulo)
+    if revalidate_days is not None:
+        main_revalidate(year, modulo, revalidate_days, max_games)
+        return
+
+    if schedule_aware and not in_game_window():
+        print("Outside of the hours when games finish, skipping...")
+        write_no_new_games()
+        finish('check_for_new_games')
+        return
 
+    if state_path is not None:
+        state = ListingState(state_path)
+        state_key = f'{year}' if modulo < 0 else f'{year}-{modulo}'
+        try:
+            unchanged, fingerprint = call_with_retries(
+                lambda number: fingerprint_listing(games_url(year), state.get(state_key)),
+                label='Checking the games listing')
         except Exception as e:
-            retries -= 1
-            driver.quit()
-            if retries == 0:
-                raise e
-        else:
-            driver.quit()
-            break
+            # The precheck only saves work, so fall through to the full check without it
+            print(f"Couldn't check whether the games listing changed: {e}")
+            unchanged, fingerprint = False, None
+        if unchanged:
+            print("Games listing hasn't changed since the last check, skipping...")
+            write_no_new_games()
+            finish('check_for_new_games')
+            return
+
+    if batch or queue_path is not None:
+        found = main_batch(year, modulo, backend_name, max_games, index_path, offline,
+                           queue_path, force_sync)
+    else:
+        found = main_single(year, modulo, backend_name, index_path, offline, force_sync)
+
+    # Only remember the listing once everything on it has been scraped, so a game whose scrape
+    # fails is still picked up by the next check
+    if state_path is not None and fingerprint is not None and not found:
+        state.set(state_key, fingerprint)
+        state.save()
+
+
+def main_single(year, modulo, backend_name, index_path=None, offline=False, force_sync=False):
+    """
+    Finds the first new game ID for that year and sets it as the `game_id` output, or NONE.
+    :return int: The new game ID, or None.
+    """
+
+    def attempt(number):
+        backend = get_backend(backend_name)
+        try:
+            print(f"Getting game IDs, attempt {number}...")
+            return check_for_new_games(backend, year, modulo, index_path, offline, force_sync)
+        finally:
+            backend.close()
+
+    game_id = call_with_retries(attempt, label='Getting game IDs')
 
     print("Scrape complete")
     if not game_id:
         print("No new game found...")
-        game_id = "NONE"
+        write_no_new_games()
+        finish('check_for_new_games')
+        return None
 
     print(f"New game found! ID is {game_id}")
 
@@ -131,6 +257,80 @@ def main(year, modulo):
     with open(os.environ['GITHUB_OUTPUT'], 'a', encoding='utf-8') as fh:
         print(f"game_id={game_id}", file=fh)
 
+    finish('check_for_new_games')
+    return game_id
+
+
+def main_batch(year, modulo, backend_name, max_games, index_path=None, offline=False,
+               queue_path=None, force_sync=False):
+    """
+    Finds every new game ID for that year and sets them as outputs for a matrix of scraping jobs:
+        game_ids -> JSON array of the new game IDs, e.g. [20101, 20102]
+        has_new_games -> 'true' or 'false', since a matrix can't be built from an empty array
+        game_id -> The first new game ID, or NONE, same as the single-game mode
+    :return list[int]: The new game IDs.
+    """
+
+    def attempt(number):
+        backend = get_backend(backend_name)
+        try:
+            print(f"Getting game IDs, attempt {number}...")
+            return find_new_games(backend, year, modulo, limit=max_games, index_path=index_path,
+                                  offline=offline, force_sync=force_sync)
+        finally:
+            backend.close()
+
+    game_ids = call_with_retries(attempt, label='Getting game IDs')
+
+    print("Scrape complete")
+    print(f"Found {len(game_ids)} new games: {game_ids}")
+
+    if queue_path is not None:
+        with WorkQueue(queue_path) as work_queue:
+            added = work_queue.enqueue((year, game_id) for game_id in game_ids)
+            print(f"Added {added} games to the work queue: {work_queue.counts()}")
+
+    write_game_ids(game_ids)
+    finish('check_for_new_games')
+    return game_ids
+
+
+def main_revalidate(year, modulo, days, max_games=None):
+    """
+    Sets the games already in the DB that were played in the last `days` days as the same outputs
+    as main_batch, to be scraped again and upserted.
+    :return list[int]: The game IDs to revalidate.
+    """
+    game_ids = get_recent_game_ids(year, days)
+    if modulo >= 0:
+        game_ids = [game_id for game_id in game_ids if game_id % 5 == modulo]
+    if max_games is not None:
+        game_ids = game_ids[:max_games]
+
+    print(f"Revalidating {len(game_ids)} games from the last {days} days: {game_ids}")
+    write_game_ids(game_ids)
+    finish('check_for_new_games')
+    return game_ids
+
+
+def write_game_ids(game_ids):
+    """
+    Sets the outputs of the batch mode for the given game IDs.
+    """
+    with open(os.environ['GITHUB_OUTPUT'], 'a', encoding='utf-8') as fh:
+        print(f"game_ids={json.dumps(game_ids)}", file=fh)
+        print(f"has_new_games={'true' if game_ids else 'false'}", file=fh)
+        print(f"game_id={game_ids[0] if game_ids else 'NONE'}", file=fh)
+
+
+def write_no_new_games():
+    """
+    Sets the outputs of both modes for when there are no new games.
+    """
+    with open(os.environ['GITHUB_OUTPUT'], 'a', encoding='utf-8') as fh:
+        print("game_ids=[]", file=fh)
+        print("has_new_games=false", file=fh)
+        print("game_id=NONE", file=fh)
 
 
 if __name__ == '__main__':
@@ -141,8 +341,44 @@ if __name__ == '__main__':
                         help='Year corresponding to season for which to scrape games. '\
                              'E.g., 2024 corresponds to the 2024/2025 season')
     parser.add_argument('-m', '--modulo', default=-1, type=int,
-                        help='If set, only return new games where gameID % 5 == args.modulo'\
-                             ' (used for scaling scraping horizontally.)')
+                        help='If set, only return new games where gameID %% 5 == args.modulo'\
+                             ' (used for scaling scraping horizontally, superseded by --queue.)')
+    parser.add_argument('-b', '--backend', default='selenium', choices=BACKENDS,
+                        help='How to fetch pages from NST. "http" fetches the HTML directly '\
+                             'without starting a browser.')
+    parser.add_argument('--batch', action='store_true',
+                        help='Output every new game ID as a JSON array for a matrix of '\
+                             'scraping jobs, rather than only the first one.')
+    parser.add_argument('-n', '--max_games', default=None, type=int,
+                        help='In batch mode, output at most this many new game IDs.')
+    parser.add_argument('-i', '--index', default=None, nargs='?', const=DEFAULT_INDEX_PATH,
+                        help='Check against a local index of scraped game IDs, synced '\
+                             'incrementally with the DB, and in full every $GAME_INDEX_TTL '\
+                             'seconds. Defaults to $GAME_INDEX_PATH, or game_index.duckdb.')
+    parser.add_argument('--offline', action='store_true',
+                        help='Use the local index as is, without connecting to the DB.')
+    parser.add_argument('--sync', action='store_true',
+                        help='Read every game ID of the season into the local index, even if '\
+                             'its last full sync is within $GAME_INDEX_TTL seconds.')
+    parser.add_argument('-q', '--queue', default=None, nargs='?', const=DEFAULT_QUEUE_PATH,
+                        help='Add the new games to this work queue for scrape_worker.py to '\
+                             'drain. Defaults to $WORK_QUEUE_PATH, or work_queue.sqlite.')
+    parser.add_argument('-s', '--state', default=None, nargs='?', const=DEFAULT_STATE_PATH,
+                        help='Skip everything if the games listing is unchanged since the last '\
+                             'run that found nothing new, going by the fingerprint saved in '\
+                             'this file. Defaults to $CHECK_STATE_PATH, or check_state.json.')
+    parser.add_argument('--schedule_aware', action='store_true',
+                        help='Skip everything outside of the hours when games finish.')
+    parser.add_argument('--revalidate', default=None, type=int, metavar='DAYS',
+                        help='Output the games already in the DB from the last DAYS days, to be '\
+                             'scraped again with --refresh and ingested with --upsert.')
     args = parser.parse_args()
 
-    main(args.year, args.modulo)
+    if args.revalidate is not None and args.queue is not None:
+        # Queue workers neither scrape games again nor upsert them
+        parser.error("--revalidate can't be combined with --queue")
+    if args.sync and args.offline:
+        parser.error("--sync can't be combined with --offline")
+
+    main(args.year, args.modulo, args.backend, args.batch, args.max_games, args.index,
+         args.offline, args.queue, args.state, args.schedule_aware, args.revalidate, args.sync)
@@ -1,71 +1,115 @@
 """
 Simple script to get a list of all game IDs in a given season and write them to a text
 file.
+
+In backlog mode, enumerates the game IDs for a range of seasons and season types at once, drops
+the ones already in the DB, and writes the rest to a prioritized backlog file that the scrapers
+can take with --from_file.
 """
 
-import time
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
+from util.backlog import write_backlog
+from util.fetch import BACKENDS, get_backend
+from util.instrument import finish, span, tags
+from util.nst import SEASON_TYPES, games_url, parse_game_id, parse_report_hrefs
+from util.rate_limit import call_with_retries
+from util.work_queue import DEFAULT_QUEUE_PATH, WorkQueue
 
-def get_game_ids(driver, year):
-    # Regular season
-    base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-               f'thruseason={year}{year+1}&stype=2&sit=5v5&loc=B&team=All&rate=n'
+# Order in which season types are scraped in the backlog, regular season first
+STYPE_PRIORITY = [2, 3, 1]
 
-    # Playoffs
-    #base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-    #           f'thruseason={year}{year+1}&stype=3&sit=5v5&loc=B&team=All&rate=n'
 
-    # Pre-season
-    #base_url = f'https://www.naturalstattrick.com/games.php?fromseason={year}{year+1}&'\
-    #           f'thruseason={year}{year+1}&stype=1&sit=5v5&loc=B&team=All&rate=n'
+def get_game_ids(backend, year, stype=2):
+    base_url = games_url(year, stype)
 
     print(f"Accessing {base_url}")
-    driver.get(base_url)
-
-    time.sleep(2)
-
-    report_elements = driver.find_elements(By.LINK_TEXT, "Limited Report")
-    href_values = [element.get_dom_attribute('href') for element in report_elements]
+    href_values = parse_report_hrefs(backend.get_page(base_url))
 
     game_ids = list()
 
     for value in href_values:
-        nst_game_id = int(value.split('game=')[1].split('&view')[0])
-        print(nst_game_id)
-        game_ids.append(nst_game_id)
+        nst_game_id = parse_game_id(value)
 
         # For the playoffs, series reports links end in 0 while game report links end in 1
         # We only want the game reports so skip if value % 0 == 0
-        #if nst_game_id % 10 == 0:
-        #    continue
+        if stype == 3 and nst_game_id % 10 == 0:
+            continue
 
-    return set(game_ids)
+        print(nst_game_id)
+        game_ids.append(nst_game_id)
 
+    return set(game_ids)
 
-def main(year):
 
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--headless')
-    retries = 3
-    while retries > 0:
+def fetch_game_ids(year, stype=2, backend_name='selenium'):
+    """
+    Runs get_game_ids with a fresh backend, retrying up to 3 times on failure.
+    """
+    def attempt(number):
+        backend = get_backend(backend_name)
         try:
-            driver = webdriver.Chrome(options=chrome_options)
-            print(f"Getting game IDs, attempt {4 - retries}...")
-            time.sleep(2)
-            game_ids = get_game_ids(driver, year)
-
-        except Exception as e:
-            retries -= 1
-            driver.quit()
-            if retries == 0:
-                raise e
-        else:
-            driver.quit()
-            break
+            print(f"Getting game IDs for {year} {SEASON_TYPES[stype]}, attempt {number}...")
+            return get_game_ids(backend, year, stype)
+        finally:
+            backend.close()
+
+    with tags(season=year, stype=stype):
+        return call_with_retries(attempt, label=f'Getting game IDs for {year}')
+
+
+def get_scraped_games(from_year, thru_year):
+    """
+    Gets every (season, gameID) in the DB for the range of seasons in one query.
+    """
+    # Imported here so that offline runs don't need duckdb
+    import duckdb
+
+    with span('warehouse_query'):
+        conn = duckdb.connect(database='md:', read_only=True)
+        rows = conn.execute("SELECT DISTINCT season, gameID FROM skater_games "\
+                            "WHERE season BETWEEN ? AND ?", [from_year, thru_year]).fetchall()
+        conn.close()
+
+    return set(rows)
+
+
+def build_backlog(from_year, thru_year, stypes, backend_name='selenium', workers=4,
+                  offline=False):
+    """
+    Enumerates the game IDs for every season and season type, fetching seasons concurrently,
+    and returns the ones not in the DB yet, ordered with the most recent season first, then by
+    season type (see STYPE_PRIORITY), then by game ID.
+
+    :return list: (season, stype, game_id) of each game in the backlog.
+    """
+    pages = [(year, stype) for year in range(from_year, thru_year + 1) for stype in stypes]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pages)))) as executor:
+        found = list(executor.map(lambda page: fetch_game_ids(*page, backend_name), pages))
+
+    scraped = set() if offline else get_scraped_games(from_year, thru_year)
+
+    backlog = [(year, stype, game_id)
+               for (year, stype), game_ids in zip(pages, found)
+               for game_id in game_ids
+               if (year, game_id) not in scraped]
+    backlog.sort(key=lambda entry: (-entry[0], STYPE_PRIORITY.index(entry[1]), entry[2]))
+
+    # A game is only listed once, under the season type scraped first
+    seen = set()
+    backlog = [entry for entry in backlog
+               if (entry[0], entry[2]) not in seen and not seen.add((entry[0], entry[2]))]
+
+    print(f"Found {sum(len(game_ids) for game_ids in found)} games, "\
+          f"{len(backlog)} not yet scraped")
+    return backlog
+
+
+def main(year, backend_name='selenium'):
+
+    game_ids = fetch_game_ids(year, 2, backend_name)
 
     print("Scrape complete")
 
@@ -76,6 +120,25 @@ def main(year):
             f.writelines(str(ids) + '\n')
 
     print("file write complete")
+    finish('get_all_game_ids')
+
+
+def main_backlog(from_year, thru_year, stypes, backend_name='selenium', workers=4,
+                 offline=False, output='backlog.csv', queue_path=None):
+    """
+    Builds the backlog for a range of seasons and season types and writes it to a file, and to
+    the work queue at queue_path if set.
+    """
+    backlog = build_backlog(from_year, thru_year, stypes, backend_name, workers, offline)
+    write_backlog(output, backlog)
+
+    print(f"Wrote backlog of {len(backlog)} games to {output}")
+
+    if queue_path is not None:
+        with WorkQueue(queue_path) as work_queue:
+            added = work_queue.enqueue((season, game_id) for season, _, game_id in backlog)
+            print(f"Added {added} games to the work queue: {work_queue.counts()}")
+    finish('get_all_game_ids')
 
 
 if __name__ == '__main__':
@@ -83,6 +146,30 @@ if __name__ == '__main__':
     parser.add_argument('-y', '--year', default=2024, type=int,
                         help='Year corresponding to season for which to scrape games. '\
                              'E.g., 2024 corresponds to the 2024/2025 season')
+    parser.add_argument('-b', '--backend', default='selenium', choices=BACKENDS,
+                        help='How to fetch pages from NST. "http" fetches the HTML directly '\
+                             'without starting a browser.')
+    parser.add_argument('--backlog', action='store_true',
+                        help='Build a backlog of unscraped games for the seasons from --year '\
+                             'through --thru_year, instead of listing a single season.')
+    parser.add_argument('-t', '--thru_year', default=None, type=int,
+                        help='Last season of the backlog. Defaults to --year.')
+    parser.add_argument('-s', '--stypes', nargs='+', default=[2], type=int,
+                        choices=SEASON_TYPES,
+                        help='Season types of the backlog: 1 preseason, 2 regular, 3 playoffs.')
+    parser.add_argument('-w', '--workers', default=4, type=int,
+                        help='Number of season pages to fetch at once for the backlog.')
+    parser.add_argument('--offline', action='store_true',
+                        help="Don't check the backlog against the DB.")
+    parser.add_argument('-o', '--output', default='backlog.csv',
+                        help='File to write the backlog to.')
+    parser.add_argument('-q', '--queue', default=None, nargs='?', const=DEFAULT_QUEUE_PATH,
+                        help='Also add the backlog to this work queue for scrape_worker.py to '\
+                             'drain. Defaults to $WORK_QUEUE_PATH, or work_queue.sqlite.')
     args = parser.parse_args()
 
-    main(args.year)
+    if args.backlog:
+        main_backlog(args.year, args.thru_year or args.year, args.stypes, args.backend,
+                     args.workers, args.offline, args.output, args.queue)
+    else:
+        main(args.year, args.backend)
@@ -0,0 +1,488 @@
+"""
+Script that loads the tables scraped for a game by scrape_game_data.py into the DB in one go.
+
+Each game leaves 24 CSVs in tables/, named {date}_{game_id}_{team}_{state}_{table}.csv. These
+are read into typed Arrow tables, the metadata in the filename is added as columns, and all
+tables of the same type are appended to their DB table in a single transaction. Alternatively,
+they can be written out as Parquet, partitioned by season and date.
+
+The team in the filename is NST's code for it. The canonical team_id and franchise of each team
+are looked up in the team dimension, see util.team_maps, for a whole table type at once, and the
+dimension itself is kept in the nhl_teams DB table for queries to join on. The team, state and
+table columns only take a handful of values, so they are dictionary encoded.
+
+A hash of the content of every table loaded is kept in the table_hashes DB table. NST sometimes
+corrects a game after the fact, so recent games can be scraped again (see
+check_for_new_games.py --revalidate) and loaded with --upsert, which only replaces the rows of
+the tables whose hash changed.
+
+With --index, every game loaded into the DB is also added to the local index of scraped games
+that check_for_new_games.py --index reads, see util.game_index.
+"""
+
+import os
+import re
+import csv
+import glob
+import json
+import hashlib
+import argparse
+from datetime import date
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as pa_ds
+import pyarrow.parquet as pa_pq
+
+from util.game_index import DEFAULT_INDEX_PATH, GameIndex
+from util.team_maps import nhl_team_columns, nhl_teams
+
+
+# DB table each type of scraped table is appended to
+TABLE_TARGETS = {
+    'st': 'skater_games',
+    'oi': 'skater_onice_games',
+    'goalies': 'goalie_games',
+}
+
+# DB table holding the hash of every table loaded, see hash_table
+HASHES_TABLE = 'table_hashes'
+
+# DB table holding the team dimension, see team_dimension
+TEAMS_TABLE = 'nhl_teams'
+
+# Columns added to every table from the team dimension
+TEAM_COLUMNS = ('team_id', 'franchise')
+
+# Type of the columns with only a handful of distinct values
+CATEGORY = pa.dictionary(pa.int8(), pa.string())
+
+# Columns of the NST tables that hold text. Every other column is a stat, read as a double so
+# that the same column has the same type in every table and game, whether or not the values in
+# one of them happen to be whole numbers.
+TEXT_COLUMNS = {'Player', 'Position', 'Team'}
+
+# How NST writes a stat that is undefined, e.g. the shooting percentage of a player without shots
+NULL_VALUES = ['-', '']
+
+TABLE_FILENAME = re.compile(r'(?P<date>\d{4}-\d{2}-\d{2})_(?P<game_id>\d+)_(?P<team>[A-Z]+)_'\
+                            r'(?P<state>all|ev|pp|pk)_(?P<table_type>st|oi|goalies)\.csv$')
+
+# Name of the manifest scrape_game_data.py keeps for a game of a season, see util.checkpoint
+MANIFEST_FILENAME = re.compile(r'(?P<season>\d{4})-(?P<game_id>\d+)\.manifest\.json$')
+
+
+def parse_table_filename(path: str, season: int | None = None) -> dict:
+    """
+    Parses the metadata out of the name of a scraped table.
+
+    :param str path: Path of the CSV, e.g. tables/2024-10-09_20001_TOR_ev_st.csv
+    :param int season: Season the table was scraped for, see load_table_seasons. If not known,
+                       it is guessed from the date of the game.
+    :return dict: season, gameID, date, team, state and table_type of the table.
+    """
+    match = TABLE_FILENAME.search(os.path.basename(path))
+    if match is None:
+        raise ValueError(f"Not a scraped game table: {path}")
+
+    game_date = date.fromisoformat(match['date'])
+    if season is None:
+        # Seasons usually start in the fall, so anything before September belongs to last
+        # year's season. Games off the usual calendar, e.g. the 2020 bubble playoffs in August
+        # and September, need the season from their manifest.
+        season = game_date.year if game_date.month >= 9 else game_date.year - 1
+    return {
+        'season': season,
+        'gameID': int(match['game_id']),
+        'date': game_date,
+        'team': match['team'],
+        'state': match['state'],
+        'table_type': match['table_type'],
+    }
+
+
+def get_column_types(path: str) -> dict[str, pa.DataType]:
+    """
+    Returns the type of every column of a scraped table, going by its header, see TEXT_COLUMNS.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        header = next(csv.reader(f), [])
+
+    # The unnamed first column is the row number
+    return {name: pa.int64() if name == '' else pa.string() if name in TEXT_COLUMNS
+            else pa.float64() for name in header}
+
+
+def read_table(path: str, season: int | None = None) -> pa.Table:
+    """
+    Reads a scraped table into a typed Arrow table, with its metadata added as columns.
+    :param int season: Season the table was scraped for, see parse_table_filename.
+    """
+    metadata = parse_table_filename(path, season)
+    table = pa_csv.read_csv(path, convert_options=pa_csv.ConvertOptions(
+        column_types=get_column_types(path), null_values=NULL_VALUES, strings_can_be_null=False))
+
+    # The first column of the NST tables is an unnamed row number
+    table = table.rename_columns([name or f'column{i}' for i, name in enumerate(table.column_names)])
+
+    types = {
+        'season': pa.int32(),
+        'gameID': pa.int64(),
+        'date': pa.date32(),
+        'team': CATEGORY,
+        'state': CATEGORY,
+        'table_type': CATEGORY,
+    }
+    for i, (name, dtype) in enumerate(types.items()):
+        table = table.add_column(i, name, pa.array([metadata[name]] * table.num_rows, dtype))
+
+    return table
+
+
+def team_dimension() -> pa.Table:
+    """
+    Returns the NHL teams of util.team_maps as an Arrow table, one row per team.
+    """
+    columns = dict(zip(nhl_team_columns, zip(*nhl_teams)))
+    return pa.table({name: pa.array(values, CATEGORY if name in TEAM_COLUMNS else pa.string())
+                     for name, values in columns.items()})
+
+
+def add_team_columns(table: pa.Table, dimension: pa.Table) -> pa.Table:
+    """
+    Adds the team_id and franchise of the NST team code in each row, looked up for the whole
+    table at once, right after the team column.
+    """
+    indices = pc.index_in(table['team'], value_set=dimension['nst'])
+    if indices.null_count:
+        unknown = sorted(set(pc.filter(table['team'], pc.is_null(indices)).to_pylist()))
+        raise ValueError(f"Unknown NST team codes {unknown}, add them to util.team_maps")
+
+    position = table.schema.get_field_index('team')
+    for offset, name in enumerate(TEAM_COLUMNS, start=1):
+        table = table.add_column(position + offset, name, dimension[name].take(indices))
+    return table
+
+
+def hash_table(path: str) -> str:
+    """
+    Returns a hash of the content of a scraped table. Cells are hashed rather than the file, so
+    that how the CSV was quoted or its line endings don't matter, only the data.
+    """
+    digest = hashlib.sha256()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.reader(f):
+            digest.update('\x1f'.join(cell.strip() for cell in row).encode('utf-8'))
+            digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def load_table_seasons(game_id: int, tables_dir: str = 'tables') -> dict[str, int]:
+    """
+    Reads the season each table of a game was scraped for out of the game's manifests, which
+    scrape_game_data.py names after the season it scraped, see util.checkpoint.GameManifest.
+
+    :return dict: File name of each table listed in a manifest -> its season.
+    """
+    seasons = {}
+    for path in glob.glob(os.path.join(tables_dir, f'*-{game_id}.manifest.json')):
+        match = MANIFEST_FILENAME.search(os.path.basename(path))
+        if match is None or int(match['game_id']) != game_id:
+            continue
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)['entries']
+        for entry in entries.values():
+            seasons[os.path.basename(entry['path'])] = int(match['season'])
+    return seasons
+
+
+def find_game_tables(game_id: int, tables_dir: str = 'tables',
+                     season: int | None = None) -> dict[str, int]:
+    """
+    Returns the paths of every table scraped for a game, with the season of each, going by the
+    game's manifests, or by the date of the game for tables without one.
+
+    Game IDs restart every season, so tables of games of several seasons with the same ID can be
+    in the same directory, e.g. when scraping a backlog. Only the tables of the given season are
+    returned, and without one, finding tables of several seasons is an error.
+
+    :return dict: Path of each table -> its season.
+    """
+    table_seasons = load_table_seasons(game_id, tables_dir)
+    paths = {path: parse_table_filename(path, table_seasons.get(os.path.basename(path)))['season']
+             for path in sorted(glob.glob(os.path.join(tables_dir, f'*_{game_id}_*.csv')))}
+    seasons = set(paths.values())
+
+    if season is not None:
+        paths = {path: path_season for path, path_season in paths.items()
+                 if path_season == season}
+    elif len(seasons) > 1:
+        raise ValueError(f"Tables of game {game_id} of seasons {sorted(seasons)} found in "\
+                         f"{tables_dir}, pick one with --year")
+
+    if not paths:
+        raise FileNotFoundError(f"No tables found for game {game_id} in {tables_dir}")
+    return paths
+
+
+def load_table_hashes(game_id: int, tables_dir: str = 'tables',
+                      season: int | None = None) -> dict[tuple, str]:
+    """
+    Hashes every table scraped for a game, see hash_table.
+
+    :return dict: (season, gameID, team, state, table_type) -> hash of that table.
+    """
+    hashes = {}
+    for path, path_season in find_game_tables(game_id, tables_dir, season).items():
+        metadata = parse_table_filename(path, path_season)
+        key = tuple(metadata[name] for name in ('season', 'gameID', 'team', 'state', 'table_type'))
+        hashes[key] = hash_table(path)
+    return hashes
+
+
+def load_game_tables(game_id: int, tables_dir: str = 'tables',
+                     season: int | None = None) -> dict[str, pa.Table]:
+    """
+    Reads every table scraped for a game, combined into one Arrow table per table type.
+
+    :param int game_id: Game to load the tables for.
+    :param str tables_dir: Directory the tables were scraped into.
+    :param int season: Season of the game, see find_game_tables.
+    :return dict: table_type -> Arrow table with every team and state of that type.
+    """
+    by_type = {}
+    for path, path_season in find_game_tables(game_id, tables_dir, season).items():
+        table = read_table(path, path_season)
+        by_type.setdefault(table['table_type'][0].as_py(), []).append(table)
+
+    dimension = team_dimension()
+    return {table_type: add_team_columns(pa.concat_tables(tables, promote_options='default'),
+                                         dimension)
+            for table_type, tables in by_type.items()}
+
+
+def ingest_to_db(tables: dict[str, pa.Table], database: str = 'md:',
+                 hashes: dict[tuple, str] | None = None) -> None:
+    """
+    Appends the tables to their DB tables, see TABLE_TARGETS, in a single transaction so that a
+    game is either fully loaded or not at all.
+
+    :param dict tables: table_type -> Arrow table, as from load_game_tables.
+    :param str database: DuckDB database to load into.
+    :param dict hashes: Hashes of the tables, as from load_table_hashes, recorded in the same
+                        transaction for upsert_to_db to compare against.
+    """
+    conn = duckdb.connect(database=database)
+    try:
+        conn.begin()
+        write_team_dimension(conn)
+        for table_type, table in tables.items():
+            target = TABLE_TARGETS[table_type]
+            conn.register('batch', table)
+            prepare_target(conn, target)
+            conn.execute(f"INSERT INTO {target} BY NAME SELECT * FROM batch")
+            conn.unregister('batch')
+            print(f"Appended {table.num_rows} rows to {target}")
+        if hashes:
+            record_hashes(conn, hashes)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def upsert_to_db(tables: dict[str, pa.Table], hashes: dict[tuple, str],
+                 database: str = 'md:') -> int:
+    """
+    Replaces the rows of only those tables whose hash differs from the one recorded when they were
+    last loaded, in a single transaction. Tables loaded before hashes were recorded count as
+    changed, so their rows are replaced as well.
+
+    :param dict tables: table_type -> Arrow table, as from load_game_tables.
+    :param dict hashes: Hashes of the tables, as from load_table_hashes.
+    :param str database: DuckDB database to load into.
+    :return int: Number of tables replaced.
+    """
+    conn = duckdb.connect(database=database)
+    try:
+        conn.begin()
+        write_team_dimension(conn)
+        create_hashes_table(conn)
+
+        stored = {}
+        for season, game_id in {key[:2] for key in hashes}:
+            rows = conn.execute(f"SELECT season, gameID, team, state, table_type, hash "\
+                                f"FROM {HASHES_TABLE} WHERE season = ? AND gameID = ?",
+                                [season, game_id]).fetchall()
+            stored.update({tuple(row[:5]): row[5] for row in rows})
+        changed = [key for key, digest in hashes.items() if stored.get(key) != digest]
+
+        for table_type, table in tables.items():
+            keys = [key for key in changed if key[4] == table_type]
+            if not keys:
+                continue
+
+            target = TABLE_TARGETS[table_type]
+            conn.register('batch', table)
+            prepare_target(conn, target)
+            for season, game_id, team, state, _ in keys:
+                conn.execute(f"DELETE FROM {target} WHERE season = ? AND gameID = ? "\
+                             f"AND team = ? AND state = ?", [season, game_id, team, state])
+                conn.execute(f"INSERT INTO {target} BY NAME SELECT * FROM batch "\
+                             f"WHERE team = ? AND state = ?", [team, state])
+            conn.unregister('batch')
+            print(f"Replaced {len(keys)} changed tables in {target}: "\
+                  f"{', '.join(f'{team}_{state}' for _, _, team, state, _ in keys)}")
+
+        record_hashes(conn, {key: hashes[key] for key in changed})
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return len(changed)
+
+
+def write_team_dimension(conn) -> None:
+    """
+    Replaces the team dimension in the DB with the one in util.team_maps.
+    """
+    conn.register('teams', team_dimension())
+    conn.execute(f"CREATE OR REPLACE TABLE {TEAMS_TABLE} AS SELECT * FROM teams")
+    conn.unregister('teams')
+
+
+def prepare_target(conn, target: str) -> None:
+    """
+    Creates the DB table for the registered batch if it doesn't exist yet, and adds any columns
+    of the batch it doesn't have, e.g. the team columns to tables created before them, filling
+    those in for the rows already there from the team dimension.
+    """
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {target} AS SELECT * FROM batch LIMIT 0")
+
+    existing = {row[0] for row in conn.execute(f"DESCRIBE {target}").fetchall()}
+    added = []
+    for name, dtype, *_ in conn.execute("DESCRIBE batch").fetchall():
+        if name not in existing:
+            conn.execute(f'ALTER TABLE {target} ADD COLUMN "{name}" {dtype}')
+            added.append(name)
+
+    team_columns = [name for name in TEAM_COLUMNS if name in added]
+    if team_columns:
+        assignments = ', '.join(f'{name} = teams.{name}' for name in team_columns)
+        conn.execute(f"UPDATE {target} SET {assignments} FROM {TEAMS_TABLE} AS teams "\
+                     f"WHERE {target}.team = teams.nst")
+        print(f"Added {', '.join(team_columns)} to {target}")
+
+
+def create_hashes_table(conn) -> None:
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HASHES_TABLE} (
+            season INTEGER NOT NULL,
+            gameID BIGINT NOT NULL,
+            team VARCHAR NOT NULL,
+            state VARCHAR NOT NULL,
+            table_type VARCHAR NOT NULL,
+            hash VARCHAR NOT NULL,
+            ingested_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+def record_hashes(conn, hashes: dict[tuple, str]) -> None:
+    """
+    Records the hashes of the given tables, replacing any recorded for them before.
+    """
+    create_hashes_table(conn)
+    for key, digest in hashes.items():
+        conn.execute(f"DELETE FROM {HASHES_TABLE} WHERE season = ? AND gameID = ? AND team = ? "\
+                     f"AND state = ? AND table_type = ?", list(key))
+        conn.execute(f"INSERT INTO {HASHES_TABLE} VALUES (?, ?, ?, ?, ?, ?, current_timestamp)",
+                     [*key, digest])
+
+
+def write_parquet(tables: dict[str, pa.Table], root: str) -> None:
+    """
+    Writes the tables as Parquet under root/{table_type}/season=.../date=.../, and the team
+    dimension to root/nhl_teams.parquet.
+
+    :param dict tables: table_type -> Arrow table, as from load_game_tables.
+    :param str root: Directory to write the dataset under.
+    """
+    os.makedirs(root, exist_ok=True)
+    pa_pq.write_table(team_dimension(), os.path.join(root, f'{TEAMS_TABLE}.parquet'))
+
+    for table_type, table in tables.items():
+        game_id = table['gameID'][0].as_py()
+        pa_ds.write_dataset(table, os.path.join(root, table_type), format='parquet',
+                            partitioning=['season', 'date'], partitioning_flavor='hive',
+                            basename_template=f'{game_id}-{{i}}.parquet',
+                            existing_data_behavior='overwrite_or_ignore')
+        print(f"Wrote {table.num_rows} rows to {os.path.join(root, table_type)}")
+
+
+def main(game_ids, tables_dir='tables', database='md:', parquet_dir=None, upsert=False,
+         season=None, index_path=None):
+    """
+    Loads the tables for each game into the DB, or into Parquet if parquet_dir is set.
+
+    If season is set, only the tables of that season's games with these IDs are loaded, which is
+    required when tables_dir holds games of several seasons.
+
+    If upsert is set, games already in the DB only have the rows of their changed tables
+    replaced, see upsert_to_db, instead of being appended again.
+
+    If index_path is set, each game is added to the local game index at that path once it is in
+    the DB.
+    """
+    for game_id in game_ids:
+        print(f"Ingesting tables for game {game_id}")
+        tables = load_game_tables(game_id, tables_dir, season)
+
+        if parquet_dir is not None:
+            write_parquet(tables, parquet_dir)
+        elif upsert:
+            changed = upsert_to_db(tables, load_table_hashes(game_id, tables_dir, season),
+                                   database)
+            if not changed:
+                print(f"No tables of game {game_id} have changed")
+        else:
+            ingest_to_db(tables, database, load_table_hashes(game_id, tables_dir, season))
+
+        if index_path is not None and parquet_dir is None and tables:
+            with GameIndex(index_path) as index:
+                index.add(next(iter(tables.values()))['season'][0].as_py(), [game_id])
+
+    print("Ingest complete")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-g', '--game_ids', nargs='+', type=int, required=True,
+                        help='Game IDs in naturalstattrick to ingest the scraped tables of.')
+    parser.add_argument('-y', '--year', default=None, type=int,
+                        help='Season of the games, e.g. 2024 for 2024/2025. Required when the '\
+                             'tables directory holds games of several seasons.')
+    parser.add_argument('--tables_dir', default='tables',
+                        help='Directory the tables were scraped into.')
+    parser.add_argument('--database', default='md:',
+                        help='DuckDB database to load the tables into.')
+    parser.add_argument('-p', '--parquet_dir', default=None,
+                        help='Write the tables as Parquet under this directory, partitioned by '\
+                             'season and date, instead of loading them into the DB.')
+    parser.add_argument('-u', '--upsert', action='store_true',
+                        help='Only replace the tables whose content changed since they were last '\
+                             'loaded, for games scraped again to pick up corrections.')
+    parser.add_argument('-i', '--index', default=None, nargs='?', const=DEFAULT_INDEX_PATH,
+                        help='Add the games loaded into the DB to this local index of scraped '\
+                             'game IDs. Defaults to $GAME_INDEX_PATH, or game_index.duckdb.')
+    args = parser.parse_args()
+
+    main(args.game_ids, args.tables_dir, args.database, args.parquet_dir, args.upsert,
+         args.year, args.index)
@@ -4,49 +4,94 @@ this to update a DB that stores such data.
 
 The tables that are to be added will be determined by what already does or does not exist in the
 DB.
+
+Selenium and asyncio are only imported on the code paths that use them, so that scraping over
+HTTP doesn't pay for importing them.
 """
 
 import os
+import sys
 import time
-import glob
-import shutil
 import argparse
 import itertools
-from selenium import webdriver
-from selenium.webdriver.common.by import By
 
+from util.backlog import read_backlog
+from util.checkpoint import GameManifest, atomic_move
+from util.fetch import BACKENDS, HttpBackend
+from util.instrument import finish, span, tags
+from util.nst import game_report_url, parse_report_details, parse_tables, write_table
+from util.page_cache import get_default_cache
+from util.rate_limit import RateLimiter, call_with_retries, get_default_limiter
 from util.team_maps import nst_team_mapping
+from util.waits import (DEFAULT_TIMEOUT, list_downloads, start_navigation, wait_for_download,
+                        wait_for_element, wait_for_navigation, wait_for_page_ready,
+                        wait_for_visible)
+
+
+# Directory Chrome saves the CSVs from the download buttons into
+DOWNLOAD_DIR = '/github/home/Downloads'
+
+# XPath of the title of a game report, used to tell that the report has been rendered
+REPORT_TITLE_XPATH = '//div[1]/div[5]/div/center/h1'
+
+
+# Pulls the header and body of every requested table out of the DOM in a single call. Where
+# DataTables has enhanced the table, use its export API so the output matches what the CSV
+# button would have produced, otherwise fall back to reading the cells directly. textContent
+# is used over innerText so that tables hidden behind unselected state labels are still read.
+EXTRACT_TABLES_JS = """
+const result = {};
+for (const tableId of arguments[0]) {
+    const table = document.getElementById(tableId);
+    if (table === null) {
+        result[tableId] = null;
+        continue;
+    }
+    if (window.jQuery && jQuery.fn.dataTable && jQuery.fn.dataTable.isDataTable(table)
+            && jQuery(table).DataTable().buttons) {
+        const data = jQuery(table).DataTable().buttons.exportData();
+        result[tableId] = {header: data.header, body: data.body};
+        continue;
+    }
+    const headerRows = table.querySelectorAll('thead tr');
+    const header = headerRows.length === 0 ? [] : Array.from(
+        headerRows[headerRows.length - 1].querySelectorAll('th, td'),
+        cell => cell.textContent.trim());
+    const body = Array.from(table.querySelectorAll('tbody tr'), row => Array.from(
+        row.querySelectorAll('th, td'), cell => cell.textContent.trim()));
+    result[tableId] = {header: header, body: body};
+}
+return result;
+"""
 
 
-def get_game_tables(driver, year, game_id):
+def get_game_tables(driver, year, game_id, timeout=DEFAULT_TIMEOUT, download_dir=DOWNLOAD_DIR,
+                    rate_limiter=None):
     """
     Given a game_id, navigates to the page for that game and scrape the requisite tables.
     :param ChromeDriver driver: ChromeDriver object that will do the scraping.
     :param int year: Year for which to check
     :param int game_id: Game ID for which to scrape data.
+    :param float timeout: Seconds to wait for the page, each table and each download.
+    :param str download_dir: Directory the driver saves downloads into.
+    :param RateLimiter rate_limiter: Used to pace the page loads, defaults to the shared limiter.
     """
+    from selenium.webdriver.common.by import By
 
     print(f"Scraping game with ID {game_id}")
 
-    report_url = f'https://www.naturalstattrick.com/game.php?season={year}{year+1}&'\
-                 f'game={game_id}&view=limited'
-    print(f"Accessing {report_url}")
-    driver.get(report_url)
-
-    time.sleep(2)
-
-    report_title = driver.find_element(By.XPATH, '//div[1]/div[5]/div/center/h1').text
-    away_team, home_team = report_title.split(' @ ')
+    # Tables already written by an earlier attempt are skipped
+    manifest = GameManifest(game_id, season=year)
+    if manifest.is_complete():
+        print(f"All tables for game {game_id} have already been scraped")
+        return
 
-    # Get the game data and store values for adding to the filename
-    game_date = driver.find_element(By.XPATH, '//div[1]/div[5]/div/center/h2').text
-    yy, mm, dd = game_date.split('\n')[0].split('-')
+    report_url = game_report_url(year, game_id)
+    print(f"Accessing {report_url}")
+    load_report(driver, report_url, timeout, rate_limiter)
 
-    # Map the team full names to the acronyms, i.e. Buffalo Sabres -> BUF
-    away_team = nst_team_mapping[away_team]
-    home_team = nst_team_mapping[home_team]
-    # NOTE Some team acronyms are slightly different in NST than Moneypuck, e.g.
-    # NJ instead of NJD. Make sure all of these cases are handled when updating DB.
+    yy, mm, dd, away_team, home_team = get_report_details(driver)
+    manifest.set_expected(get_table_outputs(away_team, home_team))
 
     # Navigate to each table in the game report and click the sections to have the download
     # buttons appear. Find the tables by using element IDs, where
@@ -59,13 +104,65 @@ def get_game_tables(driver, year, game_id):
     tables = ['st', 'oi']
     for team, table, state in itertools.product(teams, tables, game_states):
 
+        table_suffix = f'{team}_{state}_{table}'
+        goalie_suffix = f'{team}_{state}_goalies'
+        if not manifest.missing([table_suffix] + ([goalie_suffix] if table == 'st' else [])):
+            print(f"Skipping {table_suffix}, already scraped")
+            continue
+
         # Refresh the page after each iteration to avoid issues
-        driver.get(report_url)
+        load_report(driver, report_url, timeout, rate_limiter)
+
+        table_element = open_table(driver, team, table, state, timeout)
+
+        if not manifest.is_done(table_suffix):
+            with span('download_wait', team=team, table=table, state=state):
+                dl_button = table_element.find_element(By.CLASS_NAME,
+                                                       'dt-button.buttons-csv.buttons-html5')
+                print("Downloading..")
+                existing = list_downloads(download_dir)
+                driver.execute_script('arguments[0].click()', dl_button)
 
-        time.sleep(2)
+                source = wait_for_download(download_dir, existing, timeout=timeout)
+
+            # Rename and move the downloaded table
+            dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{table_suffix}.csv'
+            with span('move_file', team=team, table=table, state=state):
+                atomic_move(source, dest)
+                manifest.mark_done(table_suffix, dest)
+            print(f'Moving file {source} -> {dest}')
 
-        # Find and click the label to expand the table
-        table_label = driver.find_element(By.ID, f"{team}{table}lb")
+        # If we're gathering inidivudal stats, also grab goalie table
+        if table == 'st' and not manifest.is_done(goalie_suffix):
+            with span('download_wait', team=team, table='goalies', state=state):
+                table_parent = table_element.find_element(By.XPATH, '..')
+                goalie_table = table_parent.find_element(By.ID, f'tb{team}stgall_wrapper')
+                dl_button = goalie_table.find_element(By.CLASS_NAME,
+                                                      'dt-button.buttons-csv.buttons-html5')
+                print("Downloading goalie chart...")
+                existing = list_downloads(download_dir)
+                dl_button.click()
+
+                source = wait_for_download(download_dir, existing, timeout=timeout)
+
+            # Rename and move table
+            dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{goalie_suffix}.csv'
+            with span('move_file', team=team, table='goalies', state=state):
+                atomic_move(source, dest)
+                manifest.mark_done(goalie_suffix, dest)
+            print(f'Moving file {source} -> {dest}')
+
+
+def open_table(driver, team, table, state, timeout=DEFAULT_TIMEOUT):
+    """
+    Clicks through the labels of a loaded game report until the table for the team, table type
+    and state is showing, and returns its wrapper element, which holds its download button.
+    """
+    from selenium.webdriver.common.by import By
+
+    # Find and click the label to expand the table
+    with span('label_clicks', team=team, table=table, state=state):
+        table_label = wait_for_element(driver, By.ID, f"{team}{table}lb", timeout)
         driver.execute_script('arguments[0].click()', table_label)
 
         # Get the element representing the entire section of the table as a sibling
@@ -79,84 +176,500 @@ def get_game_tables(driver, year, game_id):
             if state in state_label.text.lower():
             # Click the one corresponding to this iteration
                 driver.execute_script('arguments[0].click()', state_label)
-
-                time.sleep(1)
-
                 break
 
         # Now that the correct table for the state is active, click the download button
         table_id = f'tb{team}{table}{state}_wrapper'
         print(table_id)
-        table_element = driver.find_element(By.ID, table_id)
-        dl_button = table_element.find_element(By.CLASS_NAME,
-                                               'dt-button.buttons-csv.buttons-html5')
-        print("Downloading..")
-        driver.execute_script('arguments[0].click()', dl_button)
+        return wait_for_visible(driver, By.ID, table_id, timeout)
 
-        time.sleep(6)
 
-        download_filepath = '/github/home/Downloads/*csv'
+def get_game_tables_tabs(driver, tabs, year, game_id, timeout=DEFAULT_TIMEOUT,
+                         rate_limiter=None):
+    """
+    Same as get_game_tables, but spreads the tables over several tabs of the one driver, each
+    with its own download directory, so that the page loads and downloads of one tab overlap
+    with those of the others.
+
+    The tables are handed out in rounds, one to each tab. Every tab starts loading the report
+    before any of them is waited on, then each one opens its table and starts its download, and
+    only then are the downloads collected. Since a tab only ever has one download in flight, and
+    nothing else saves into its directory, each file is routed to its output deterministically.
+    :param ChromeDriver driver: ChromeDriver object that will do the scraping.
+    :param list tabs: (window handle, download directory) of each tab, as from open_tab.
+    :param int year: Year for which to check
+    :param int game_id: Game ID for which to scrape data.
+    :param float timeout: Seconds to wait for the page, each table and each download.
+    :param RateLimiter rate_limiter: Used to pace the page loads, defaults to the shared limiter.
+    """
+    from selenium.webdriver.common.by import By
 
-        # Find the files
-        search = glob.glob(download_filepath)
-        print(f"search results: {search}")
+    print(f"Scraping game with ID {game_id} in {len(tabs)} tabs")
 
-        # Rename and move the downloaded table
-        source = glob.glob(download_filepath)[0]
-        dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{team}_{state}_{table}.csv'
-        shutil.move(source, dest)
-        print(f'Moving file {source} -> {dest}')
+    manifest = GameManifest(game_id, season=year)
+    if manifest.is_complete():
+        print(f"All tables for game {game_id} have already been scraped")
+        return
 
-        # If we're gathering inidivudal stats, also grab goalie table
+    report_url = game_report_url(year, game_id)
+    print(f"Accessing {report_url}")
+    driver.switch_to.window(tabs[0][0])
+    load_report(driver, report_url, timeout, rate_limiter)
+
+    yy, mm, dd, away_team, home_team = get_report_details(driver)
+    manifest.set_expected(get_table_outputs(away_team, home_team))
+
+    items = [(team, table, state) for team, table, state
+             in itertools.product([away_team, home_team], ['st', 'oi'], ['all', 'ev', 'pp', 'pk'])
+             if manifest.missing([f'{team}_{state}_{table}']
+                                 + ([f'{team}_{state}_goalies'] if table == 'st' else []))]
+
+    rate_limiter = rate_limiter or get_default_limiter()
+    for start in range(0, len(items), len(tabs)):
+        batch = list(zip(tabs, items[start:start + len(tabs)]))
+
+        # Start every tab loading the report before waiting on any of them
+        for (handle, _), _ in batch:
+            driver.switch_to.window(handle)
+            with span('rate_limit_wait'):
+                rate_limiter.wait(report_url)
+            start_navigation(driver, report_url)
+
+        # Open each tab's table and start its download
+        started = []
+        for (handle, tab_dir), (team, table, state) in batch:
+            driver.switch_to.window(handle)
+            with span('page_load'):
+                try:
+                    wait_for_navigation(driver, timeout)
+                    wait_for_element(driver, By.XPATH, REPORT_TITLE_XPATH, timeout)
+                except Exception:
+                    rate_limiter.record(report_url, error=True)
+                    raise
+            # The tabs load at once and are waited on in turn, so how long each took isn't known,
+            # only that it loaded
+            rate_limiter.record(report_url)
+            table_element = open_table(driver, team, table, state, timeout)
+
+            existing = list_downloads(tab_dir)
+            suffix = f'{team}_{state}_{table}'
+            if not manifest.is_done(suffix):
+                dl_button = table_element.find_element(By.CLASS_NAME,
+                                                       'dt-button.buttons-csv.buttons-html5')
+                print(f"Downloading {suffix}..")
+                driver.execute_script('arguments[0].click()', dl_button)
+            started.append((handle, tab_dir, existing, table_element, team, table, state))
+
+        # Collect the downloads, then the goalie tables, one at a time per tab
+        for handle, tab_dir, existing, table_element, team, table, state in started:
+            suffix = f'{team}_{state}_{table}'
+            if not manifest.is_done(suffix):
+                with span('download_wait', team=team, table=table, state=state):
+                    source = wait_for_download(tab_dir, existing, timeout=timeout)
+                dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{suffix}.csv'
+                with span('move_file', team=team, table=table, state=state):
+                    atomic_move(source, dest)
+                    manifest.mark_done(suffix, dest)
+                print(f'Moving file {source} -> {dest}')
+
+            goalie_suffix = f'{team}_{state}_goalies'
+            if table == 'st' and not manifest.is_done(goalie_suffix):
+                driver.switch_to.window(handle)
+                with span('download_wait', team=team, table='goalies', state=state):
+                    table_parent = table_element.find_element(By.XPATH, '..')
+                    goalie_table = table_parent.find_element(By.ID, f'tb{team}stgall_wrapper')
+                    dl_button = goalie_table.find_element(By.CLASS_NAME,
+                                                          'dt-button.buttons-csv.buttons-html5')
+                    print("Downloading goalie chart...")
+                    existing = list_downloads(tab_dir)
+                    dl_button.click()
+
+                    source = wait_for_download(tab_dir, existing, timeout=timeout)
+                dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{goalie_suffix}.csv'
+                with span('move_file', team=team, table='goalies', state=state):
+                    atomic_move(source, dest)
+                    manifest.mark_done(goalie_suffix, dest)
+                print(f'Moving file {source} -> {dest}')
+
+
+def load_report(driver, report_url, timeout=DEFAULT_TIMEOUT, rate_limiter=None):
+    """
+    Navigates to a game report and waits until it has loaded and its title has been rendered.
+    :param ChromeDriver driver: ChromeDriver object that will do the scraping.
+    :param str report_url: URL of the game report.
+    :param float timeout: Seconds to wait for the page.
+    :param RateLimiter rate_limiter: Used to pace the page load, defaults to the shared limiter.
+    """
+    from selenium.webdriver.common.by import By
+
+    rate_limiter = rate_limiter or get_default_limiter()
+    with span('rate_limit_wait'):
+        rate_limiter.wait(report_url)
+
+    start = time.monotonic()
+    with span('page_load'):
+        try:
+            driver.get(report_url)
+            wait_for_page_ready(driver, timeout)
+            wait_for_element(driver, By.XPATH, REPORT_TITLE_XPATH, timeout)
+        except Exception:
+            rate_limiter.record(report_url, error=True)
+            raise
+    rate_limiter.record(report_url, time.monotonic() - start)
+
+
+def get_report_details(driver):
+    """
+    Reads the title and date of the game report currently loaded in the driver.
+    :param ChromeDriver driver: ChromeDriver object with the game report loaded.
+    :return tuple: Year, month and day of the game, followed by the away and home team acronyms.
+    """
+    from selenium.webdriver.common.by import By
+
+    report_title = driver.find_element(By.XPATH, REPORT_TITLE_XPATH).text
+    away_team, home_team = report_title.split(' @ ')
+
+    # Get the game data and store values for adding to the filename
+    game_date = driver.find_element(By.XPATH, '//div[1]/div[5]/div/center/h2').text
+    yy, mm, dd = game_date.split('\n')[0].split('-')
+
+    # Map the team full names to the acronyms, i.e. Buffalo Sabres -> BUF
+    away_team = nst_team_mapping[away_team]
+    home_team = nst_team_mapping[home_team]
+    # NOTE Some team acronyms are slightly different in NST than Moneypuck, e.g.
+    # NJ instead of NJD. Make sure all of these cases are handled when updating DB.
+
+    return yy, mm, dd, away_team, home_team
+
+
+def get_game_tables_single_load(driver, year, game_id, timeout=DEFAULT_TIMEOUT,
+                                rate_limiter=None):
+    """
+    Same as get_game_tables, but loads the game report only once and reads every table straight
+    out of the DOM instead of clicking through the labels and downloading each one as a CSV.
+    Writes the same files to tables/ as get_game_tables.
+    :param ChromeDriver driver: ChromeDriver object that will do the scraping.
+    :param int year: Year for which to check
+    :param int game_id: Game ID for which to scrape data.
+    :param float timeout: Seconds to wait for the page.
+    :param RateLimiter rate_limiter: Used to pace the page load, defaults to the shared limiter.
+    """
+
+    print(f"Scraping game with ID {game_id} in a single load")
+
+    manifest = GameManifest(game_id, season=year)
+    if manifest.is_complete():
+        print(f"All tables for game {game_id} have already been scraped")
+        return
+
+    report_url = game_report_url(year, game_id)
+    print(f"Accessing {report_url}")
+    load_report(driver, report_url, timeout, rate_limiter)
+
+    yy, mm, dd, away_team, home_team = get_report_details(driver)
+    outputs = get_table_outputs(away_team, home_team)
+    manifest.set_expected(outputs)
+    outputs = {suffix: outputs[suffix] for suffix in manifest.missing(outputs)}
+
+    with span('extract_tables'):
+        table_data = driver.execute_script(EXTRACT_TABLES_JS, sorted(set(outputs.values())))
+    with span('write_tables'):
+        write_tables(table_data, outputs, f'{yy}-{mm}-{dd}', game_id, manifest)
+
+
+def get_game_tables_http(backend, year, game_id):
+    """
+    Same as get_game_tables_single_load, but fetches the game report over plain HTTP and parses
+    the tables out of the raw HTML, so no browser is needed.
+    :param HttpBackend backend: Backend used to fetch the page.
+    :param int year: Year for which to check
+    :param int game_id: Game ID for which to scrape data.
+    """
+
+    print(f"Scraping game with ID {game_id} over HTTP")
+
+    manifest = GameManifest(game_id, season=year)
+    if manifest.is_complete():
+        print(f"All tables for game {game_id} have already been scraped")
+        return
+
+    report_url = game_report_url(year, game_id)
+    print(f"Accessing {report_url}")
+    page_source = backend.get_page(report_url)
+
+    try:
+        yy, mm, dd, away_team, home_team = parse_report_details(page_source)
+        outputs = get_table_outputs(away_team, home_team)
+        manifest.set_expected(outputs)
+        outputs = {suffix: outputs[suffix] for suffix in manifest.missing(outputs)}
+
+        with span('parse_tables'):
+            table_data = parse_tables(page_source, sorted(set(outputs.values())))
+        check_tables_found(table_data)
+    except Exception:
+        # Don't let a page that can't be parsed be served from the cache on the next attempt
+        backend.forget(report_url)
+        raise
+    with span('write_tables'):
+        write_tables(table_data, outputs, f'{yy}-{mm}-{dd}', game_id, manifest)
+
+
+def get_table_outputs(away_team, home_team):
+    """
+    Maps the suffix of each output file for a game, i.e. '{team}_{state}_{table}', to the ID
+    of the table in the game report it is written from.
+    :param str away_team: Acronym of the away team.
+    :param str home_team: Acronym of the home team.
+    :return dict: Output suffix -> table element ID.
+    """
+    teams = [away_team, home_team]
+    game_states = ['all', 'ev', 'pp', 'pk']
+    tables = ['st', 'oi']
+
+    # NST only has the one goalie table per team, which is what the download path saves for
+    # every state as well.
+    outputs = {}
+    for team, table, state in itertools.product(teams, tables, game_states):
+        outputs[f'{team}_{state}_{table}'] = f'tb{team}{table}{state}'
         if table == 'st':
-            table_parent = table_element.find_element(By.XPATH, '..')
-            goalie_table = table_parent.find_element(By.ID, f'tb{team}stgall_wrapper')
-            dl_button = goalie_table.find_element(By.CLASS_NAME,
-                                                  'dt-button.buttons-csv.buttons-html5')
-            print("Downloading goalie chart...")
-            dl_button.click()
+            outputs[f'{team}_{state}_goalies'] = f'tb{team}stgall'
 
-            time.sleep(4)
+    return outputs
 
-            # Rename and move table
-            source = glob.glob(download_filepath)[0]
-            dest = f'tables/{yy}-{mm}-{dd}_{game_id}_{team}_{state}_goalies.csv'
-            shutil.move(source, dest)
-            print(f'Moving file {source} -> {dest}')
 
+def write_tables(table_data, outputs, game_date, game_id, manifest=None):
+    """
+    Writes every table extracted from a game report to tables/.
+    :param dict table_data: Table element ID -> dict with the 'header' and 'body' of the table.
+    :param dict outputs: Output suffix -> table element ID, as from get_table_outputs.
+    :param str game_date: Date of the game, as YYYY-MM-DD.
+    :param int game_id: Game ID the tables belong to.
+    :param GameManifest manifest: If set, each table written is recorded in it.
+    """
+    check_tables_found(table_data)
+
+    for suffix, table_id in outputs.items():
+        dest = f'tables/{game_date}_{game_id}_{suffix}.csv'
+        write_table(table_data[table_id], dest)
+        if manifest is not None:
+            manifest.mark_done(suffix, dest)
+        print(f'Writing table {table_id} -> {dest}')
 
-def main(year, game_id):
+
+def check_tables_found(table_data):
+    """
+    Raises a ValueError if any of the tables extracted from a game report wasn't on the page,
+    which is how a page that was cut off shows, since a table may legitimately be empty.
+    """
+    missing = [table_id for table_id, data in table_data.items() if data is None]
+    if missing:
+        raise ValueError(f"Tables not found in game report: {missing}")
+
+
+def create_driver(download_dir=None):
+    """
+    Starts the headless Chrome instance used to scrape game reports.
+    :param str download_dir: If set, directory the driver should save downloads into.
+    :return ChromeDriver: The new driver.
+    """
+    from util import driver as util_driver
+
+    return util_driver.create_driver(download_dir=download_dir)
+
+
+def forget_game(year, game_id, tables_dir='tables'):
+    """
+    Makes the next scrape of a game start over, to pick up corrections NST made to it since it was
+    scraped: drops its manifest, so every table is written again, and its report from the page
+    cache, so the report is fetched again.
+    """
+    manifest = GameManifest(game_id, tables_dir, season=year)
+    if os.path.exists(manifest.path):
+        os.remove(manifest.path)
+
+    cache = get_default_cache()
+    if cache is not None:
+        for backend_name in BACKENDS:
+            cache.forget(game_report_url(year, game_id), backend_name)
+
+
+def main(year, game_id, single_load=False, backend_name='selenium', timeout=DEFAULT_TIMEOUT,
+         tabs=1, refresh=False):
     """
     Main function which initializes and runs the scraper.
+
+    If refresh is set, the game is scraped again even if it already has been, see forget_game.
     """
 
     # Create a directory to store the tables, if it doesn't already exist
     if not os.path.isdir('tables/'):
         os.mkdir('tables/')
 
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--headless')
-    chrome_prefs = {"download.default_directory": "./tables"}
-    chrome_options.experimental_options["prefs"] = chrome_prefs
-    retries = 3
-    while retries > 0:
-        try:
-            driver = webdriver.Chrome(options=chrome_options)
-            print(f"Getting game tables, attempt {4 - retries}...")
-            time.sleep(2)
+    if refresh:
+        forget_game(year, int(game_id))
 
-            get_game_tables(driver, year, game_id)
-        except Exception as e:
-            retries -= 1
-            driver.quit()
-            if retries == 0:
-                raise e
-        else:
-            driver.quit()
-            break
+    scrape_game(year, game_id, single_load, backend_name, timeout, tabs=tabs)
 
     print("Scrape complete")
+    finish('scrape_game_data')
+
+
+def scrape_game(year, game_id, single_load=False, backend_name='selenium',
+                timeout=DEFAULT_TIMEOUT, download_dir=None, rate_limiter=None,
+                http_backend=None, tabs=1):
+    """
+    Scrapes the tables for a single game, retrying up to 3 times on failure.
+    :param int year: Year for which to check
+    :param int game_id: Game ID for which to scrape data.
+    :param bool single_load: Read every table from a single page load instead of downloading them.
+    :param str backend_name: 'selenium' to use Chrome, or 'http' to fetch and parse the raw HTML.
+    :param float timeout: Seconds to wait for a page, table or download before giving up.
+    :param str download_dir: Directory Chrome should save downloads into, if not the default.
+    :param RateLimiter rate_limiter: Used to pace the page loads, defaults to the shared limiter.
+    :param HttpBackend http_backend: Backend to reuse for the http backend, instead of creating
+                                     one for this game.
+    :param int tabs: If more than 1, download the tables in this many tabs of the one Chrome,
+                     each saving into its own subdirectory of download_dir.
+    """
+    if backend_name == HttpBackend.name:
+        scrape_over_http(year, game_id, http_backend, rate_limiter)
+        return
+
+    from util import driver as util_driver
+
+    def attempt(number):
+        driver = create_driver(download_dir)
+        try:
+            print(f"Getting game tables, attempt {number}...")
+
+            if single_load:
+                get_game_tables_single_load(driver, year, game_id, timeout, rate_limiter)
+            elif tabs > 1:
+                tab_dirs = [os.path.join(download_dir or DOWNLOAD_DIR, f'tab-{i}')
+                            for i in range(tabs)]
+                handles = [util_driver.open_tab(driver, tab_dir) for tab_dir in tab_dirs]
+                get_game_tables_tabs(driver, list(zip(handles, tab_dirs)), year, game_id,
+                                     timeout, rate_limiter)
+            else:
+                get_game_tables(driver, year, game_id, timeout,
+                                download_dir or DOWNLOAD_DIR, rate_limiter)
+        finally:
+            driver.quit()
+
+    with tags(game_id=game_id):
+        call_with_retries(attempt, label=f'Game {game_id}')
+
+
+def scrape_over_http(year, game_id, backend=None, rate_limiter=None):
+    """
+    Runs get_game_tables_http, retrying on failure the same way the browser scraper does.
+    """
+    owns_backend = backend is None
+    if owns_backend:
+        backend = HttpBackend(rate_limiter=rate_limiter)
+    def attempt(number):
+        print(f"Getting game tables over HTTP, attempt {number}...")
+        get_game_tables_http(backend, year, game_id)
+
+    try:
+        with tags(game_id=game_id):
+            call_with_retries(attempt, label=f'Game {game_id}')
+    finally:
+        if owns_backend:
+            backend.close()
+
+
+async def scrape_games(year, game_ids, concurrency=4, rate=None, single_load=False,
+                       backend_name='selenium', timeout=DEFAULT_TIMEOUT, tabs=1):
+    """
+    Scrapes many games concurrently, with at most `concurrency` in flight at once and page loads
+    to NST paced to at most `rate` per second.
+
+    Each worker gets its own download directory, so that concurrent downloads can't be mixed up.
+    :param list game_ids: Game IDs of `year`, or (season, game_id) pairs for games across
+                          several seasons, e.g. from a backlog file.
+    :return list[dict]: Result for each game, with its game_id, whether it succeeded, the
+                        seconds it took and the error if it failed.
+    """
+    import asyncio
+
+    rate_limiter = RateLimiter(rate) if rate else get_default_limiter()
+    jobs = asyncio.Queue()
+    for game in game_ids:
+        jobs.put_nowait(game if isinstance(game, tuple) else (year, game))
+
+    results = []
+
+    async def worker(worker_id):
+        download_dir = os.path.abspath(os.path.join('downloads', f'worker-{worker_id}'))
+        os.makedirs(download_dir, exist_ok=True)
+
+        http_backend = None
+        if backend_name == HttpBackend.name:
+            http_backend = HttpBackend(rate_limiter=rate_limiter)
+
+        try:
+            while not jobs.empty():
+                season, game_id = jobs.get_nowait()
+                start = time.monotonic()
+                try:
+                    await asyncio.to_thread(scrape_game, season, game_id, single_load,
+                                            backend_name, timeout, download_dir, rate_limiter,
+                                            http_backend, tabs)
+                except Exception as e:
+                    results.append({'game_id': game_id, 'succeeded': False,
+                                    'seconds': time.monotonic() - start, 'error': repr(e)})
+                else:
+                    results.append({'game_id': game_id, 'succeeded': True,
+                                    'seconds': time.monotonic() - start, 'error': None})
+        finally:
+            if http_backend is not None:
+                http_backend.close()
+
+    await asyncio.gather(*(worker(i) for i in range(min(concurrency, len(game_ids)))))
+    return results
+
+
+def print_summary(results, elapsed):
+    """
+    Prints how long each game took and whether it was scraped, followed by the totals.
+    """
+    print(f"{'game_id':>10} {'status':>8} {'seconds':>8}  error")
+    for result in sorted(results, key=lambda r: r['game_id']):
+        status = 'ok' if result['succeeded'] else 'FAILED'
+        print(f"{result['game_id']:>10} {status:>8} {result['seconds']:>8.1f}  "\
+              f"{result['error'] or ''}")
+
+    succeeded = sum(result['succeeded'] for result in results)
+    print(f"Scraped {succeeded}/{len(results)} games in {elapsed:.1f} seconds, "\
+          f"{len(results) - succeeded} failed")
+
+
+def main_many(year, game_ids, concurrency=4, rate=None, single_load=False,
+              backend_name='selenium', timeout=DEFAULT_TIMEOUT, tabs=1, refresh=False):
+    """
+    Scrapes many games concurrently and prints a summary of the results.
+    If refresh is set, games are scraped again even if they already have been.
+    :return bool: Whether every game was scraped successfully.
+    """
+
+    # Create a directory to store the tables, if it doesn't already exist
+    if not os.path.isdir('tables/'):
+        os.mkdir('tables/')
+
+    if refresh:
+        for game in game_ids:
+            forget_game(*(game if isinstance(game, tuple) else (year, game)))
+
+    import asyncio
+
+    start = time.monotonic()
+    results = asyncio.run(scrape_games(year, game_ids, concurrency, rate, single_load,
+                                       backend_name, timeout, tabs))
+    print_summary(results, time.monotonic() - start)
+    finish('scrape_game_data')
+
+    return all(result['succeeded'] for result in results)
 
 
 if __name__ == '__main__':
@@ -166,6 +679,39 @@ if __name__ == '__main__':
                              'E.g., 2024 corresponds to the 2024/2025 season')
     parser.add_argument('-g', '--game_id',
                         help='Game ID in naturalstattrick for which to scrape game data.')
+    parser.add_argument('-s', '--single_load', action='store_true',
+                        help='Load the game report once and read every table from the page, '\
+                             'rather than downloading each table separately.')
+    parser.add_argument('-b', '--backend', default='selenium', choices=BACKENDS,
+                        help='How to fetch the game report. "http" fetches and parses the HTML '\
+                             'directly without starting a browser.')
+    parser.add_argument('-t', '--timeout', default=DEFAULT_TIMEOUT, type=float,
+                        help='Seconds to wait for a page, table or download before giving up.')
+    parser.add_argument('--game_ids', nargs='+', type=int, default=None,
+                        help='Scrape several games concurrently rather than a single one.')
+    parser.add_argument('-f', '--from_file', default=None,
+                        help='Scrape every game in this file concurrently, either a backlog '\
+                             'or a list of game IDs of --year written by get_all_game_ids.py.')
+    parser.add_argument('-c', '--concurrency', default=4, type=int,
+                        help='Number of games to scrape at once with --game_ids/--from_file.')
+    parser.add_argument('-r', '--rate', default=None, type=float,
+                        help='Page loads per second to NST to start at with '\
+                             '--game_ids/--from_file, adapted to how NST responds. Defaults to '\
+                             '$SCRAPER_RATE, or unlimited.')
+    parser.add_argument('--tabs', default=1, type=int,
+                        help='Download the tables of a game in this many tabs of the one Chrome '\
+                             'at once, each with its own download directory.')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Scrape the games again even if they already have been, bypassing '\
+                             'the page cache, e.g. for check_for_new_games.py --revalidate.')
     args = parser.parse_args()
 
-    main(year=args.year, game_id=args.game_id)
+    if args.game_ids or args.from_file:
+        game_ids = args.game_ids or read_backlog(args.from_file, args.year)
+        if not main_many(args.year, game_ids, args.concurrency, args.rate, args.single_load,
+                         args.backend, args.timeout, args.tabs, args.refresh):
+            sys.exit(1)
+    else:
+        main(year=args.year, game_id=args.game_id, single_load=args.single_load,
+             backend_name=args.backend, timeout=args.timeout, tabs=args.tabs,
+             refresh=args.refresh)
@@ -1,88 +1,264 @@
 import os
+import json
 import time
-import glob
-import shutil
 import argparse
 from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.keys import Keys
+from concurrent.futures import ThreadPoolExecutor
+
+from util.checkpoint import atomic_move, atomic_write
+from util.fetch import BACKENDS, HttpBackend
+from util.instrument import finish, span, tags
+from util.nst import NST_BASE_URL, parse_tables, write_table
+from util.rate_limit import call_with_retries, get_default_limiter
 
 """
-Script that uses selenium to navigate to various web pages holding team tables and download them.
+Script that downloads the team tables from various stats websites into /tables.
+
+MoneyPuck serves its teams table as a static CSV, and NST renders its team table into the page,
+so by default both are fetched over plain HTTP: the MoneyPuck CSV is streamed straight to disk,
+skipped if it hasn't changed since the last download, and the NST table is parsed out of the
+HTML. The Selenium path, which navigates to the pages and clicks their download links, is kept
+as a fallback.
 """
 
+MP_BASE_URL = os.environ.get('MP_BASE_URL', 'https://moneypuck.com').rstrip('/')
+TABLES_DIR = '/tables'
+
+# ETag and Last-Modified of each URL downloaded and the file it was written to, for the
+# conditional requests of the next run
+VALIDATORS_FILE = '.downloads.json'
+
+# Element ID of the team table in NST's teamtable.php
+NST_TEAM_TABLE_ID = 'teams'
+
+TABLES = ('mp', 'nst')
+
+
+def get_mp_url(year):
+    return f'{MP_BASE_URL}/moneypuck/playerData/seasonSummary/{year}/regular/teams.csv'
+
+
+def get_nst_url(year):
+    return f'{NST_BASE_URL}/teamtable.php?fromseason={year}{year+1}&thruseason={year}{year+1}'\
+           f'&stype=2&sit=sva&score=all&rate=y&team=all&loc=B&gpf=410&fd=&td='
+
 
 def get_nst_table(driver, year):
-    base_url = f'http://naturalstattrick.com/teamtable.php?fromseason={year}{year+1}&thruseason={year}{year+1}'\
-               f'&stype=2&sit=sva&score=all&rate=y&team=all&loc=B&gpf=410&fd=&td='
-    driver.get(base_url)
-    dl_button =  driver.find_elements_by_xpath('/html/body/div[1]/div[5]/div/div/input[23]')[0]
+    from selenium.webdriver.common.by import By
+
+    driver.get(get_nst_url(year))
+    dl_button = driver.find_elements(By.XPATH, '/html/body/div[1]/div[5]/div/div/input[23]')[0]
     dl_button.click()
 
 
 def get_eh_table(driver, year):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+
     driver.get('https://evolving-hockey.com/login/')
-    #driver.find_element_by_id('user_login').send_keys(config.eh_username)
-    #driver.find_element_by_id('user_pass').send_keys(config.eh_password)
-    driver.find_element_by_id('user_pass').send_keys(Keys.ENTER)
+    #driver.find_element(By.ID, 'user_login').send_keys(config.eh_username)
+    #driver.find_element(By.ID, 'user_pass').send_keys(config.eh_password)
+    driver.find_element(By.ID, 'user_pass').send_keys(Keys.ENTER)
     base_url = f'https://evolving-hockey.com/stats/team_standard/?_inputs_&std_tm_str=%225v5%22&std_tm_span=%22Regular%22&'\
                f'std_tm_type=%22Rates%22&std_tm_group=%22Season%22&std_tm_table=%22On-Ice%22&std_tm_team=%22All%22&std_tm_range'\
                f'=%22Seasons%22&std_tm_adj=%22Score%20%26%20Venue%22&dir_ttbl=%22Stats%22&std_tm_season=%22{year}{year+1}%22'
     driver.get(base_url)
     time.sleep(2)
-    dl_button = driver.find_element_by_id('std_tm_download_ui').find_element_by_xpath('./*')
+    dl_button = driver.find_element(By.ID, 'std_tm_download_ui').find_element(By.XPATH, './*')
     dl_button.click()
 
 
 def get_mp_table(driver, year):
-    driver.get('https://moneypuck.com/data.htm')
-    dl_button = driver.find_element_by_xpath(f'//a[@href="moneypuck/playerData/seasonSummary/{year}/regular/teams.csv"]')
+    from selenium.webdriver.common.by import By
+
+    driver.get(f'{MP_BASE_URL}/data.htm')
+    dl_button = driver.find_element(
+        By.XPATH, f'//a[@href="moneypuck/playerData/seasonSummary/{year}/regular/teams.csv"]')
     dl_button.click()
 
 
-def organize_tables():
-    map_pairs = [('teams.csv', 'mp_team_table.csv')]
-#    map_pairs = [('*EH*.csv', 'eh_team_table.csv'),
-#                 ('*Natural*.csv', 'nst_team_table.csv'),
-#                 ('teams.csv', 'mp_team_table.csv')]
-    if not os.path.isdir('/tables/'):
-        os.mkdir('/tables')
+def get_dest(table, year, years, tables_dir=TABLES_DIR):
+    """
+    Returns where the table for the season is written. With a single season, this is the same
+    {table}_team_table.csv as always, and with several each season gets its own file.
+    """
+    name = f'{table}_team_table.csv' if len(years) == 1 else f'{table}_team_table_{year}.csv'
+    return os.path.join(tables_dir, name)
+
+
+def load_validators(tables_dir=TABLES_DIR):
+    path = os.path.join(tables_dir, VALIDATORS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_validators(validators, tables_dir=TABLES_DIR):
+    with atomic_write(os.path.join(tables_dir, VALIDATORS_FILE), encoding='utf-8') as f:
+        json.dump(validators, f, indent=2)
+
+
+def forget_validators(validators, dest):
+    """
+    Drops the validators of every download written to dest, which has been overwritten since.
+    """
+    for url in [url for url, other in validators.items() if other.get('dest') == dest]:
+        del validators[url]
+
+
+def download_mp_table(backend, year, dest, previous=None):
+    """
+    Streams the MoneyPuck teams CSV for the season into dest, unless it is unchanged since the
+    download that previous holds the validators of. previous is only used if that download was
+    written to dest too, since dest may hold another season's table otherwise.
+    :return dict: Validators of the new download and dest, or previous if the file was unchanged.
+    """
+    url = get_mp_url(year)
+    if previous is not None and previous.get('dest') != dest:
+        previous = None
 
-    for exp, dest in map_pairs:
-        source = glob.glob(f'./{exp}')[0]
-        dest = f'/tables/{dest}'
-        shutil.move(source, dest)
-        print(f'{source} -> {dest}')
+    print(f'Downloading {url}')
+    validators = backend.download(url, dest, previous)
+    if validators is None:
+        print(f'{dest} is unchanged, skipping')
+        return previous
 
+    print(f'{url} -> {dest}')
+    return {**validators, 'dest': dest}
 
-def main(year):
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument('--no-sandbox')
-    chrome_options.add_argument('--headless')
-    retries = 3
-    while retries > 0:
+
+def download_nst_table(backend, year, dest):
+    """
+    Fetches NST's team table for the season and writes it to dest as a CSV, in the same format
+    as its download button.
+    """
+    url = get_nst_url(year)
+    print(f'Accessing {url}')
+    table = parse_tables(backend.get_page(url), [NST_TEAM_TABLE_ID])[NST_TEAM_TABLE_ID]
+    if table is None:
+        raise ValueError(f'No team table found at {url}')
+
+    write_table(table, dest)
+    print(f'{url} -> {dest}')
+
+
+def fetch_table(backend, table, year, years, validators, tables_dir=TABLES_DIR, retries=3):
+    """
+    Downloads one table for one season over HTTP, retrying on failure.
+    :return dict: Validators of the file, or None if the table doesn't have any.
+    """
+    dest = get_dest(table, year, years, tables_dir)
+
+    def attempt(number):
+        if table == 'mp':
+            return download_mp_table(backend, year, dest, validators.get(get_mp_url(year)))
+        download_nst_table(backend, year, dest)
+        return None
+
+    with tags(table=table, season=year):
+        return call_with_retries(attempt, retries, label=f'Getting {table} table for {year}')
+
+
+def main_http(years, tables=('mp',), workers=4, tables_dir=TABLES_DIR):
+    """
+    Downloads the tables for every season over HTTP, several at once.
+    """
+    os.makedirs(tables_dir, exist_ok=True)
+    validators = load_validators(tables_dir)
+
+    backend = HttpBackend(pool_size=workers)
+    jobs = [(table, year) for year in years for table in tables]
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as executor:
+            results = list(executor.map(
+                lambda job: fetch_table(backend, *job, years, validators, tables_dir), jobs))
+    finally:
+        backend.close()
+
+    for (table, year), result in zip(jobs, results):
+        if result is not None:
+            forget_validators(validators, result['dest'])
+            validators[get_mp_url(year)] = result
+    save_validators(validators, tables_dir)
+
+
+def main_selenium(year, years, tables_dir=TABLES_DIR):
+    """
+    Downloads the MoneyPuck teams table for the season by clicking its link in Chrome, into the
+    same file as over HTTP for a run over the given years, see get_dest.
+    """
+    # Imported here so the HTTP path doesn't need selenium at all
+    from util.driver import create_driver
+    from util.waits import list_downloads, wait_for_download
+
+    download_dir = os.path.abspath('downloads')
+    os.makedirs(download_dir, exist_ok=True)
+    os.makedirs(tables_dir, exist_ok=True)
+
+    limiter = get_default_limiter()
+
+    def attempt(number):
+        driver = create_driver(download_dir=download_dir)
         try:
-            driver = webdriver.Chrome(chrome_options=chrome_options)
             print('Getting MP table...')
-            time.sleep(2)
-            get_mp_table(driver, year)
-            time.sleep(2)
-        except Exception as e:
-            print(e)
-            print(f"Scraper failed, {retries} tries left....")
-            retries -= 1
+            existing = list_downloads(download_dir)
+            limiter.wait(MP_BASE_URL)
+            with span('page_load', table='mp'):
+                get_mp_table(driver, year)
+            with span('download_wait', table='mp'):
+                return wait_for_download(download_dir, existing)
+        finally:
             driver.quit()
-        else:
-            print('Organizing tables....')
-            organize_tables()
-            break
 
-    driver.quit()
+    source = call_with_retries(attempt, label='Getting MP table')
+
+    print('Organizing tables....')
+    dest = get_dest('mp', year, years, tables_dir)
+    with span('move_file'):
+        atomic_move(source, dest)
+    print(f'{source} -> {dest}')
+
+    validators = load_validators(tables_dir)
+    forget_validators(validators, dest)
+    save_validators(validators, tables_dir)
+
+
+def main(year, thru_year=None, tables=('mp',), backend_name='http', workers=4,
+         tables_dir=TABLES_DIR):
+    years = list(range(year, (thru_year or year) + 1))
+
+    if backend_name == HttpBackend.name:
+        main_http(years, tables, workers, tables_dir)
+    else:
+        if set(tables) != {'mp'}:
+            raise ValueError(f"Only the mp table can be downloaded with the {backend_name} "\
+                             f"backend, not {sorted(set(tables) - {'mp'})}")
+        for season in years:
+            main_selenium(season, years, tables_dir)
+
+    finish('scrape_team_tables')
 
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('-y', '--year', default=datetime.now().year)
+    parser.add_argument('-y', '--year', default=datetime.now().year, type=int)
+    parser.add_argument('--thru_year', default=None, type=int,
+                        help='Also get the tables of every season from --year through this one, '\
+                             'each written to its own file.')
+    parser.add_argument('--tables', nargs='+', default=['mp'], choices=TABLES,
+                        help='Which team tables to get. Only "mp" with the selenium backend.')
+    parser.add_argument('-b', '--backend', default='http', choices=BACKENDS,
+                        help='"http" downloads the tables directly, "selenium" clicks through '\
+                             'the site in Chrome.')
+    parser.add_argument('-w', '--workers', default=4, type=int,
+                        help='Number of tables to download at once over HTTP.')
+    parser.add_argument('-o', '--tables_dir', default=TABLES_DIR,
+                        help='Directory to write the tables to.')
     args = parser.parse_args()
 
-    main(year=args.year)
+    if args.backend != HttpBackend.name and set(args.tables) != {'mp'}:
+        parser.error(f'--tables {" ".join(args.tables)} needs the http backend, only mp can be '\
+                     f'downloaded with {args.backend}')
+
+    main(args.year, args.thru_year, args.tables, args.backend, args.workers, args.tables_dir)
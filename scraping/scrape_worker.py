@@ -0,0 +1,316 @@
+"""
+Long-running worker that scrapes game reports from NaturalStatTrick.com using warm, reusable
+Chrome sessions.
+
+Rather than starting Chrome for every game, the worker keeps one or more drivers alive and feeds
+them game IDs read from stdin or a file, one per line, or a backlog written by
+get_all_game_ids.py --backlog, e.g.
+
+    python get_all_game_ids.py -y 2024 && python scrape_worker.py -y 2024 -f game_ids_2024.txt
+
+Each driver is recycled after a set number of games or as soon as it stops responding. Health
+and throughput counters are printed as the worker runs, and can also be written to a JSON file.
+
+With --queue, the worker drains a shared work queue instead (see util.work_queue), leasing one
+game at a time. Any number of workers, on any number of runners, can drain the same queue:
+
+    python check_for_new_games.py --batch --queue && python scrape_worker.py --queue
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+
+from scrape_game_data import DEFAULT_TIMEOUT, create_driver, get_game_tables_single_load
+from util.backlog import parse_backlog_lines
+from util.instrument import finish, span, tags
+from util.rate_limit import retry_delay
+from util.work_queue import DEFAULT_LEASE_SECONDS, DEFAULT_QUEUE_PATH, LeaseHeartbeat, WorkQueue
+
+# Longest to sleep between checks of the queue while other workers hold every remaining game
+QUEUE_POLL_SECONDS = 15
+
+
+class WarmDriver:
+    """
+    Wraps a ChromeDriver that is kept alive between games, and replaced once it has handled
+    max_jobs games or stops responding.
+    """
+
+    def __init__(self, stats, max_jobs=50):
+        self.stats = stats
+        self.max_jobs = max_jobs
+        self.driver = None
+        self.jobs = 0
+
+    def get(self):
+        """
+        Returns a driver that is ready for the next game, starting a new one if needed.
+        """
+        if self.driver is not None and (self.jobs >= self.max_jobs or not self.is_healthy()):
+            print(f"Recycling driver after {self.jobs} games")
+            self.stats.increment('drivers_recycled')
+            self.quit()
+
+        if self.driver is None:
+            self.driver = create_driver()
+            self.jobs = 0
+            self.stats.increment('drivers_started')
+
+        return self.driver
+
+    def is_healthy(self):
+        """
+        Checks that the browser still responds to commands.
+        """
+        try:
+            return self.driver.execute_script('return 1') == 1
+        except Exception:
+            return False
+
+    def mark_unhealthy(self):
+        """
+        Throws the current driver away so that the next game gets a fresh one.
+        """
+        self.stats.increment('drivers_recycled')
+        self.quit()
+
+    def quit(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Error quitting driver: {e}")
+            self.driver = None
+
+
+class WorkerStats:
+    """
+    Thread-safe health and throughput counters for the worker.
+    """
+
+    def __init__(self, stats_file=None):
+        self.stats_file = stats_file
+        self.started = time.monotonic()
+        self.lock = threading.Lock()
+        self.counters = {
+            'games_scraped': 0,
+            'games_failed': 0,
+            'attempts_failed': 0,
+            'drivers_started': 0,
+            'drivers_recycled': 0,
+        }
+        self.scrape_seconds = 0.0
+
+    def increment(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def record_game(self, succeeded, seconds):
+        with self.lock:
+            self.counters['games_scraped' if succeeded else 'games_failed'] += 1
+            self.scrape_seconds += seconds
+        self.write()
+
+    def snapshot(self):
+        """
+        Returns the current counters along with the derived throughput figures.
+        """
+        with self.lock:
+            elapsed = time.monotonic() - self.started
+            games = self.counters['games_scraped'] + self.counters['games_failed']
+            return {
+                **self.counters,
+                'elapsed_seconds': round(elapsed, 2),
+                'games_per_minute': round(60 * games / elapsed, 2) if elapsed else 0.0,
+                'mean_seconds_per_game': round(self.scrape_seconds / games, 2) if games else 0.0,
+            }
+
+    def write(self):
+        """
+        Writes the current counters to the stats file, if there is one.
+        """
+        if self.stats_file is None:
+            return
+        tmp_path = f'{self.stats_file}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, self.stats_file)
+
+
+def run_worker(name, jobs, stats, max_jobs, timeout, retries=3):
+    """
+    Pulls (season, game_id) jobs off the queue and scrapes them with a warm driver until it gets
+    a None.
+    """
+    warm_driver = WarmDriver(stats, max_jobs)
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            season, game_id = job
+
+            start = time.monotonic()
+            succeeded = False
+            for attempt in range(1, retries + 1):
+                try:
+                    with tags(game_id=game_id, attempt=attempt, worker=name), span('attempt'):
+                        print(f"[{name}] Getting game tables for {game_id}, "\
+                              f"attempt {attempt}...")
+                        get_game_tables_single_load(warm_driver.get(), season, game_id,
+                                                    timeout)
+                except Exception as e:
+                    print(f"[{name}] Game {game_id} failed on attempt {attempt}: {e}")
+                    stats.increment('attempts_failed')
+                    warm_driver.mark_unhealthy()
+                    if attempt < retries:
+                        with span('backoff_wait'):
+                            time.sleep(retry_delay(attempt, e))
+                else:
+                    warm_driver.jobs += 1
+                    succeeded = True
+                    break
+
+            stats.record_game(succeeded, time.monotonic() - start)
+            print(f"[{name}] {'Scraped' if succeeded else 'Gave up on'} game {game_id}. "\
+                  f"Stats: {stats.snapshot()}")
+    finally:
+        warm_driver.quit()
+
+
+def run_queue_worker(name, queue_path, stats, max_jobs, timeout,
+                     lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Leases games from the work queue one at a time and scrapes them with a warm driver, until
+    there are none left pending or leased. A failed game goes back on the queue to be retried,
+    by this or any other worker, until it runs out of attempts. The lease on the game being
+    scraped is renewed for as long as it takes.
+    """
+    owner = f'{socket.gethostname()}-{os.getpid()}-{name}'
+    warm_driver = WarmDriver(stats, max_jobs)
+    work_queue = WorkQueue(queue_path)
+    try:
+        while True:
+            claimed = work_queue.claim(owner, lease_seconds)
+            if not claimed:
+                # Games leased by other workers come back if their lease runs out, so wait for
+                # those rather than exiting while they could still be stragglers
+                next_expiry = work_queue.next_expiry()
+                if next_expiry is None:
+                    break
+                time.sleep(min(max(next_expiry - time.time(), 1), QUEUE_POLL_SECONDS))
+                continue
+
+            season, game_id = claimed[0]
+            start = time.monotonic()
+            heartbeat = LeaseHeartbeat(queue_path, owner, season, game_id, lease_seconds)
+            try:
+                with tags(game_id=game_id, worker=name), span('attempt'), heartbeat:
+                    print(f"[{name}] Getting game tables for {season} game {game_id}...")
+                    get_game_tables_single_load(warm_driver.get(), season, game_id, timeout)
+            except Exception as e:
+                print(f"[{name}] Game {game_id} failed: {e}")
+                stats.increment('attempts_failed')
+                warm_driver.mark_unhealthy()
+                if not work_queue.fail(season, game_id, repr(e), owner):
+                    print(f"[{name}] Lost the lease on game {game_id}, leaving it to its new owner")
+                succeeded = False
+            else:
+                warm_driver.jobs += 1
+                work_queue.complete(season, game_id)
+                succeeded = True
+
+            stats.record_game(succeeded, time.monotonic() - start)
+            print(f"[{name}] {'Scraped' if succeeded else 'Released'} game {game_id}. "\
+                  f"Stats: {stats.snapshot()}")
+    finally:
+        work_queue.close()
+        warm_driver.quit()
+
+
+def main(year, from_file=None, drivers=1, max_jobs=50, timeout=DEFAULT_TIMEOUT, stats_file=None,
+         queue_path=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """
+    Starts the worker threads, each with their own warm driver, and feeds them game IDs until
+    the input runs out.
+
+    If queue_path is set, the threads drain the work queue at that path instead.
+    """
+
+    # Create a directory to store the tables, if it doesn't already exist
+    if not os.path.isdir('tables/'):
+        os.mkdir('tables/')
+
+    stats = WorkerStats(stats_file)
+
+    if queue_path is not None:
+        threads = [threading.Thread(target=run_queue_worker, name=f'worker-{i}',
+                                    args=(f'worker-{i}', queue_path, stats, max_jobs, timeout,
+                                          lease_seconds))
+                   for i in range(drivers)]
+        for thread in threads:
+            thread.start()
+    else:
+        jobs = queue.Queue(maxsize=drivers * 2)
+
+        threads = [threading.Thread(target=run_worker, name=f'worker-{i}',
+                                    args=(f'worker-{i}', jobs, stats, max_jobs, timeout))
+                   for i in range(drivers)]
+        for thread in threads:
+            thread.start()
+
+        source = open(from_file, encoding='utf-8') if from_file else sys.stdin
+        try:
+            for job in parse_backlog_lines(source, year):
+                jobs.put(job)
+        finally:
+            for _ in threads:
+                jobs.put(None)
+            if from_file:
+                source.close()
+
+    for thread in threads:
+        thread.join()
+
+    if queue_path is not None:
+        with WorkQueue(queue_path) as work_queue:
+            print(f"Queue: {work_queue.counts()}")
+
+    stats.write()
+    print(f"Worker finished: {stats.snapshot()}")
+    finish('scrape_worker')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-y', '--year', default=2024, type=int,
+                        help='Year corresponding to season for which to scrape games. '\
+                             'E.g., 2024 corresponds to the 2024/2025 season')
+    parser.add_argument('-f', '--from_file', default=None,
+                        help='File of game IDs of --year to scrape, one per line, or a '\
+                             'backlog. Reads from stdin if not given.')
+    parser.add_argument('-d', '--drivers', default=1, type=int,
+                        help='Number of warm Chrome drivers to scrape with in parallel.')
+    parser.add_argument('-r', '--max_jobs', default=50, type=int,
+                        help='Recycle a driver after it has scraped this many games.')
+    parser.add_argument('-t', '--timeout', default=DEFAULT_TIMEOUT, type=float,
+                        help='Seconds to wait for a page before giving up.')
+    parser.add_argument('-s', '--stats_file', default=None,
+                        help='If set, write the health and throughput counters to this JSON '\
+                             'file after every game.')
+    parser.add_argument('-q', '--queue', default=None, nargs='?', const=DEFAULT_QUEUE_PATH,
+                        help='Drain this work queue rather than a list of game IDs. Defaults '\
+                             'to $WORK_QUEUE_PATH, or work_queue.sqlite.')
+    parser.add_argument('-l', '--lease', default=DEFAULT_LEASE_SECONDS, type=float,
+                        help='With --queue, seconds a game stays leased to this worker. The '\
+                             'lease is renewed while the game is being scraped, so this is how '\
+                             'long a worker that dies holds on to it.')
+    args = parser.parse_args()
+
+    main(args.year, args.from_file, args.drivers, args.max_jobs, args.timeout, args.stats_file,
+         args.queue, args.lease)
@@ -0,0 +1,50 @@
+"""
+Reading and writing the backlog files of games to scrape.
+
+A backlog is a CSV with a season,stype,game_id header, one game per line, in the order the games
+should be scraped. Plain files with one game ID per line, like the ones get_all_game_ids.py
+writes for a single season, are read as well, with the season given by the caller.
+"""
+
+import csv
+
+
+BACKLOG_COLUMNS = ['season', 'stype', 'game_id']
+
+
+def write_backlog(path: str, entries) -> None:
+    """
+    Writes (season, stype, game_id) entries to a backlog file, in the order given.
+    """
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(BACKLOG_COLUMNS)
+        writer.writerows(entries)
+
+
+def parse_backlog_lines(lines, default_season: int):
+    """
+    Parses the lines of a backlog or plain game ID file, lazily so that it can read from a pipe.
+
+    :param lines: Lines of the file.
+    :param int default_season: Season of the games in a plain game ID file.
+    :return: Yields (season, game_id) of each game, in file order.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line == ','.join(BACKLOG_COLUMNS):
+            continue
+
+        fields = line.split(',')
+        if len(fields) == 1:
+            yield default_season, int(fields[0])
+        else:
+            yield int(fields[0]), int(fields[2])
+
+
+def read_backlog(path: str, default_season: int) -> list[tuple[int, int]]:
+    """
+    Reads a backlog or plain game ID file, see parse_backlog_lines.
+    """
+    with open(path, encoding='utf-8') as f:
+        return list(parse_backlog_lines(f, default_season))
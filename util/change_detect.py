@@ -0,0 +1,115 @@
+"""
+Cheap check of whether the NST games listing has changed since the last time every game on it was
+found to be scraped, so that scheduled polling can stop early instead of starting Chrome and
+querying the DB.
+
+The listing is fetched with a plain conditional GET, and its fingerprint is the hash of its game
+report links. Fingerprints are kept in a small JSON state file, which can be cached between
+workflow runs.
+"""
+
+import os
+import json
+import time
+import hashlib
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import requests
+
+from util.checkpoint import atomic_write
+from util.fetch import USER_AGENT
+from util.instrument import span
+from util.nst import parse_report_hrefs
+from util.rate_limit import get_default_limiter, parse_retry_after
+
+
+DEFAULT_STATE_PATH = os.environ.get('CHECK_STATE_PATH', 'check_state.json')
+
+# Games finish between the early afternoon matinees and the late west coast games, Eastern time.
+# Outside of these hours, and in the months without any games at all, there is nothing to poll for.
+GAME_TIMEZONE = ZoneInfo('America/New_York')
+GAME_WINDOW_HOURS = (14, 3)
+OFFSEASON_MONTHS = {7, 8}
+
+
+class ListingState:
+    """
+    Fingerprints of the games listing from earlier runs, keyed by what was being checked,
+    e.g. the season.
+    """
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self.entries = json.load(f)
+
+    def get(self, key: str) -> dict | None:
+        return self.entries.get(key)
+
+    def set(self, key: str, entry: dict) -> None:
+        self.entries[key] = entry
+
+    def save(self) -> None:
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
+
+
+def fingerprint_listing(url: str, previous: dict | None = None,
+                        timeout: float = 30) -> tuple[bool, dict]:
+    """
+    Fetches the games listing and compares it to the fingerprint from an earlier run.
+
+    The request is conditional on the ETag and Last-Modified of the earlier run, if the server
+    gave any, so an unchanged listing may not even be downloaded.
+
+    :param str url: URL of the games listing.
+    :param dict previous: Fingerprint saved by an earlier run, if any.
+    :param float timeout: Seconds to wait for the response.
+    :return tuple: Whether the listing is unchanged, and its current fingerprint.
+    """
+    headers = {'User-Agent': USER_AGENT}
+    if previous is not None:
+        if previous.get('etag'):
+            headers['If-None-Match'] = previous['etag']
+        if previous.get('last_modified'):
+            headers['If-Modified-Since'] = previous['last_modified']
+
+    limiter = get_default_limiter()
+    limiter.wait(url)
+    with span('listing_precheck'):
+        start = time.monotonic()
+        response = requests.get(url, headers=headers, timeout=timeout)
+        limiter.record(url, time.monotonic() - start, response.status_code,
+                       retry_after=parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code == 304 and previous is not None:
+            return True, previous
+        response.raise_for_status()
+
+        hrefs = sorted(set(parse_report_hrefs(response.text)))
+        digest = hashlib.sha256('\n'.join(hrefs).encode('utf-8')).hexdigest()
+
+    entry = {
+        'hash': digest,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'games': len(hrefs),
+        'checked_at': datetime.now(GAME_TIMEZONE).isoformat(timespec='seconds'),
+    }
+    return previous is not None and previous.get('hash') == digest, entry
+
+
+def in_game_window(now: datetime | None = None) -> bool:
+    """
+    Returns whether a game could realistically have finished around now, see GAME_WINDOW_HOURS.
+    """
+    now = (now or datetime.now(GAME_TIMEZONE)).astimezone(GAME_TIMEZONE)
+    if now.month in OFFSEASON_MONTHS:
+        return False
+
+    start, end = GAME_WINDOW_HOURS
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
@@ -0,0 +1,106 @@
+"""
+Checkpointing for the game scraper, so that a retry or a rerun only fetches the tables that are
+missing instead of starting the whole game over.
+
+Every table written for a game is recorded in a manifest next to the tables, and all outputs are
+written atomically, so a file in tables/ is either complete or not there at all.
+"""
+
+import os
+import json
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+
+# mkstemp creates files only the owner can read, so outputs are given the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(dest: str, mode: str = 'w', **kwargs):
+    """
+    Opens a temporary file next to dest for writing, which replaces dest once the block exits
+    without an error. On an error the temporary file is removed and dest is left untouched.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f:
+            yield f
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, dest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_move(source: str, dest: str) -> None:
+    """
+    Moves source to dest such that dest only ever appears complete, even when the two are on
+    different filesystems.
+    """
+    tmp_path = os.path.join(os.path.dirname(dest) or '.', f'.tmp-{os.path.basename(dest)}')
+    shutil.move(source, tmp_path)
+    os.replace(tmp_path, dest)
+
+
+class GameManifest:
+    """
+    Record of which outputs of a game have been written, keyed by their suffix,
+    i.e. '{team}_{state}_{table}'.
+
+    Game IDs restart every season, so the season is part of the manifest's name when given.
+    """
+
+    def __init__(self, game_id, tables_dir: str = 'tables', season=None):
+        name = f'{game_id}' if season is None else f'{season}-{game_id}'
+        self.path = os.path.join(tables_dir, f'{name}.manifest.json')
+        self.expected = []
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as f:
+                saved = json.load(f)
+            self.expected = saved['expected']
+            self.entries = saved['entries']
+
+    def is_complete(self) -> bool:
+        """
+        Checks whether every expected output of the game has been written.
+        """
+        return bool(self.expected) and not self.missing(self.expected)
+
+    def set_expected(self, suffixes) -> None:
+        """
+        Records the full set of outputs the game should have, once they are known.
+        """
+        self.expected = sorted(suffixes)
+        self.save()
+
+    def is_done(self, suffix: str) -> bool:
+        """
+        Checks whether an output was written, and that the file is still there and the same size
+        as when it was recorded.
+        """
+        entry = self.entries.get(suffix)
+        if entry is None or not os.path.exists(entry['path']):
+            return False
+        return entry['size'] > 0 and os.path.getsize(entry['path']) == entry['size']
+
+    def missing(self, suffixes) -> list[str]:
+        """
+        Returns the suffixes out of the given ones that still need to be written.
+        """
+        return [suffix for suffix in suffixes if not self.is_done(suffix)]
+
+    def mark_done(self, suffix: str, path: str) -> None:
+        """
+        Records an output as written and saves the manifest.
+        """
+        self.entries[suffix] = {'path': path, 'size': os.path.getsize(path)}
+        self.save()
+
+    def save(self) -> None:
+        with atomic_write(self.path, encoding='utf-8') as f:
+            json.dump({'expected': self.expected, 'entries': self.entries}, f, indent=2)
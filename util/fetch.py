@@ -0,0 +1,189 @@
+"""
+Pluggable backends for fetching the HTML of a page.
+
+NST serves its pages statically, so most of the time a pooled HTTP client is all that's needed.
+The Selenium backend is kept around as a fallback for when a real browser is required.
+
+Both backends read pages from the page cache when it's enabled, see util.page_cache, and pace
+their requests with the shared rate limiter unless given their own, see util.rate_limit.
+"""
+
+import os
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from util.checkpoint import atomic_write
+from util.instrument import span
+from util.page_cache import get_default_cache
+from util.rate_limit import get_default_limiter, parse_retry_after
+
+
+USER_AGENT = 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) '\
+             'Chrome/131.0.0.0 Safari/537.36'
+
+
+class HttpBackend:
+    """
+    Fetches pages with a keep-alive requests Session, so that consecutive requests to the same
+    host reuse the same connection.
+    """
+    name = 'http'
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30, rate_limiter=None, cache=None):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_default_limiter()
+        self.cache = cache if cache is not None else get_default_cache()
+        self.session = requests.Session()
+        self.session.headers.update({'User-Agent': USER_AGENT})
+
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_page(self, url: str) -> str:
+        """
+        Returns the HTML of the page at the given URL.
+        """
+        if self.cache is not None:
+            with span('cache_read'):
+                page = self.cache.get(url, self.name)
+            if page is not None:
+                return page
+
+        with span('http_fetch'):
+            response = self.request(url)
+
+        if self.cache is not None:
+            self.cache.put(url, response.text, self.name)
+        return response.text
+
+    def request(self, url: str, **kwargs) -> requests.Response:
+        """
+        Sends a GET through the rate limiter, reports how it went, and raises if it failed.
+        A 304 is returned as is, for conditional requests.
+        """
+        self.rate_limiter.wait(url)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, timeout=self.timeout, **kwargs)
+        except requests.RequestException:
+            self.rate_limiter.record(url, error=True)
+            raise
+
+        self.rate_limiter.record(url, time.monotonic() - start, response.status_code,
+                                 retry_after=parse_retry_after(response.headers.get('Retry-After')))
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response
+
+    def forget(self, url: str):
+        """
+        Drops the page at the given URL from the cache, so the next get_page fetches it again.
+        """
+        if self.cache is not None:
+            self.cache.forget(url, self.name)
+
+    def download(self, url: str, dest: str, previous: dict | None = None,
+                 chunk_size: int = 64 * 1024) -> dict | None:
+        """
+        Streams the file at the given URL into dest, which only appears once it is complete.
+
+        If dest already exists and previous holds the ETag and Last-Modified of the download that
+        wrote it, the request is conditional on them, and nothing is written if the file hasn't
+        changed.
+
+        :return dict: ETag and Last-Modified of the file downloaded, or None if it was unchanged.
+        """
+        headers = {}
+        if previous is not None and os.path.exists(dest):
+            if previous.get('etag'):
+                headers['If-None-Match'] = previous['etag']
+            if previous.get('last_modified'):
+                headers['If-Modified-Since'] = previous['last_modified']
+
+        with span('http_download'):
+            with self.request(url, headers=headers, stream=True) as response:
+                if response.status_code == 304:
+                    return None
+
+                with atomic_write(dest, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size):
+                        f.write(chunk)
+
+        return {'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+
+    def close(self):
+        self.session.close()
+
+
+class SeleniumBackend:
+    """
+    Fetches pages by loading them in a headless Chrome instance.
+    """
+    name = 'selenium'
+
+    def __init__(self, driver=None, timeout: float = 30, rate_limiter=None, cache=None):
+        self.timeout = timeout
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_default_limiter()
+        self.cache = cache if cache is not None else get_default_cache()
+        if driver is None:
+            # Imported here so the HTTP backend doesn't need selenium at all
+            from util.driver import create_driver
+
+            driver = create_driver()
+        self.driver = driver
+
+    def get_page(self, url: str) -> str:
+        """
+        Returns the HTML of the page at the given URL, once it has been rendered.
+        """
+        # Imported here for the same reason as selenium itself
+        from util.waits import wait_for_page_ready
+
+        if self.cache is not None:
+            with span('cache_read'):
+                page = self.cache.get(url, self.name)
+            if page is not None:
+                return page
+
+        self.rate_limiter.wait(url)
+        start = time.monotonic()
+        with span('page_load'):
+            try:
+                self.driver.get(url)
+                wait_for_page_ready(self.driver, self.timeout)
+            except Exception:
+                self.rate_limiter.record(url, error=True)
+                raise
+        self.rate_limiter.record(url, time.monotonic() - start)
+        page = self.driver.page_source
+
+        if self.cache is not None:
+            self.cache.put(url, page, self.name)
+        return page
+
+    def forget(self, url: str):
+        """
+        Drops the page at the given URL from the cache, so the next get_page loads it again.
+        """
+        if self.cache is not None:
+            self.cache.forget(url, self.name)
+
+    def close(self):
+        self.driver.quit()
+
+
+BACKENDS = {
+    HttpBackend.name: HttpBackend,
+    SeleniumBackend.name: SeleniumBackend,
+}
+
+
+def get_backend(name: str, **kwargs):
+    """
+    Creates the fetch backend with the given name, one of the keys of BACKENDS.
+    """
+    return BACKENDS[name](**kwargs)
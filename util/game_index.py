@@ -0,0 +1,132 @@
+"""
+Local index of the game IDs that have already been scraped into the warehouse, kept in a small
+DuckDB file so it can be cached between workflow runs.
+
+Instead of pulling every distinct gameID for the season from MotherDuck on each check, the index
+only asks the warehouse for IDs above the highest one it has already seen. Since games aren't
+always ingested in order, candidate IDs below that point that aren't in the index yet are
+confirmed with a point lookup rather than assumed to be missing.
+
+Both of those queries are cheap, so they run on every check, and games loaded by other runners
+show up in the index right away. ingest_game_tables.py --index also adds every game it loads to
+the index. Once the last full sync of a season is older than a TTL, every game ID of the season
+is read from the warehouse again instead, replacing what the index holds for it.
+"""
+
+import os
+import time
+
+
+DEFAULT_INDEX_PATH = os.environ.get('GAME_INDEX_PATH', 'game_index.duckdb')
+
+# Seconds after which every game ID of a season is read from the warehouse again
+DEFAULT_SYNC_TTL = float(os.environ.get('GAME_INDEX_TTL', 6 * 60 * 60))
+
+
+class GameIndex:
+    """
+    Set of scraped game IDs per season, backed by a local DuckDB file.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        # Imported here so that importing DEFAULT_INDEX_PATH doesn't pay for importing duckdb
+        import duckdb
+
+        self.conn = duckdb.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS scraped_games (
+                season INTEGER NOT NULL,
+                gameID INTEGER NOT NULL,
+                PRIMARY KEY (season, gameID)
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS index_syncs (
+                season INTEGER PRIMARY KEY,
+                synced_at DOUBLE NOT NULL
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get_ids(self, season: int) -> set[int]:
+        """
+        Returns every game ID in the index for the season.
+        """
+        rows = self.conn.execute("SELECT gameID FROM scraped_games WHERE season = ?",
+                                 [season]).fetchall()
+        return {row[0] for row in rows}
+
+    def last_seen(self, season: int) -> int | None:
+        """
+        Returns the highest game ID in the index for the season, or None if it has none.
+        """
+        return self.conn.execute("SELECT max(gameID) FROM scraped_games WHERE season = ?",
+                                 [season]).fetchone()[0]
+
+    def is_stale(self, season: int, ttl: float = DEFAULT_SYNC_TTL) -> bool:
+        """
+        Returns whether every game ID of the season was last read from the warehouse more than ttl
+        seconds ago, or never.
+        """
+        row = self.conn.execute("SELECT synced_at FROM index_syncs WHERE season = ?",
+                                [season]).fetchone()
+        return row is None or time.time() - row[0] > ttl
+
+    def add(self, season: int, game_ids) -> None:
+        """
+        Records the given game IDs as scraped.
+        """
+        rows = [(season, game_id) for game_id in set(game_ids)]
+        if rows:
+            self.conn.executemany("INSERT OR IGNORE INTO scraped_games VALUES (?, ?)", rows)
+
+    def sync(self, season: int, warehouse, candidates=None, full: bool = False) -> None:
+        """
+        Brings the index up to date with the warehouse.
+
+        :param int season: Season to sync.
+        :param warehouse: Open DuckDB connection to the warehouse holding skater_games.
+        :param candidates: Game IDs about to be checked against the index. Any of these below the
+                           highest ID already seen that aren't in the index are looked up in the
+                           warehouse directly, in case they were ingested out of order.
+        :param bool full: Read every game ID of the season from the warehouse, replacing what the
+                          index holds for it, rather than only the new ones.
+        """
+        last_seen = None if full else self.last_seen(season)
+
+        if last_seen is None:
+            rows = warehouse.execute("SELECT DISTINCT gameID FROM skater_games WHERE season = ?",
+                                     [season]).fetchall()
+            self.conn.begin()
+            self.conn.execute("DELETE FROM scraped_games WHERE season = ?", [season])
+            self.add(season, (row[0] for row in rows))
+            self.conn.execute("INSERT OR REPLACE INTO index_syncs VALUES (?, ?)",
+                              [season, time.time()])
+            self.conn.commit()
+            print(f"Synced all {len(rows)} game IDs into the local index for {season}")
+            return
+
+        rows = warehouse.execute("SELECT DISTINCT gameID FROM skater_games "\
+                                 "WHERE season = ? AND gameID > ?",
+                                 [season, last_seen]).fetchall()
+        self.add(season, (row[0] for row in rows))
+        print(f"Synced {len(rows)} new game IDs into the local index for {season}")
+
+        if not candidates:
+            return
+
+        gaps = sorted(game_id for game_id in set(candidates) - self.get_ids(season)
+                      if game_id < last_seen)
+        if gaps:
+            rows = warehouse.execute("SELECT DISTINCT gameID FROM skater_games "\
+                                     "WHERE season = ? AND list_contains(?, gameID)",
+                                     [season, gaps]).fetchall()
+            self.add(season, (row[0] for row in rows))
@@ -0,0 +1,183 @@
+"""
+Lightweight timing instrumentation shared by the scrapers.
+
+Stages are wrapped in named spans, tagged with whatever context is known at the time (game_id,
+team, state, table, attempt...). Tags set with `tags()` apply to every span opened inside that
+block, including in threads started from it through asyncio.to_thread. Finished spans are
+appended as JSON lines to $SCRAPER_TIMINGS_FILE if it is set, and a per-stage summary can be
+printed at the end of a run and written as a Prometheus textfile to $SCRAPER_PROM_FILE, along with
+any gauges set during the run, e.g. the state of the rate limiter.
+
+A span costs two perf_counter calls and a dict update, so this is left on in production.
+"""
+
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+
+current_tags = contextvars.ContextVar('current_tags', default={})
+
+
+class Instrumentation:
+    """
+    Collects the spans of a run and aggregates them per stage.
+    """
+
+    def __init__(self, jsonl_path: str | None = None, prom_path: str | None = None):
+        self.jsonl_path = jsonl_path
+        self.prom_path = prom_path
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.gauges = {}
+        self.jsonl = None
+
+    @contextmanager
+    def span(self, stage: str, **span_tags):
+        """
+        Times the block as an occurrence of `stage`. A span that raises is recorded as an error
+        and the exception is re-raised.
+        """
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            yield
+        except BaseException:
+            status = 'error'
+            raise
+        finally:
+            self.record(stage, time.perf_counter() - start, status,
+                        {**current_tags.get(), **span_tags})
+
+    def record(self, stage: str, seconds: float, status: str, span_tags: dict) -> None:
+        with self.lock:
+            totals = self.stages.setdefault(stage, {'count': 0, 'errors': 0, 'seconds': 0.0,
+                                                    'max_seconds': 0.0})
+            totals['count'] += 1
+            totals['errors'] += status == 'error'
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+
+            if self.jsonl_path is not None:
+                if self.jsonl is None:
+                    self.jsonl = open(self.jsonl_path, 'a', encoding='utf-8')
+                self.jsonl.write(json.dumps({'ts': time.time(), 'stage': stage,
+                                             'seconds': round(seconds, 6), 'status': status,
+                                             **span_tags}, default=str) + '\n')
+                self.jsonl.flush()
+
+    def set_gauge(self, metric: str, value: float, description: str = '', **labels) -> None:
+        """
+        Sets the current value of a gauge, written to the Prometheus textfile with the stages.
+        """
+        with self.lock:
+            gauge = self.gauges.setdefault(metric, {'description': description, 'values': {}})
+            gauge['values'][tuple(sorted(labels.items()))] = value
+
+    def summary(self) -> dict:
+        with self.lock:
+            return {stage: dict(totals) for stage, totals in self.stages.items()}
+
+    def print_summary(self) -> None:
+        """
+        Prints the count, total, mean and max time of each stage, slowest stage first.
+        """
+        summary = self.summary()
+        if not summary:
+            return
+
+        print(f"{'stage':<28} {'count':>6} {'errors':>6} {'total s':>9} {'mean s':>8} "\
+              f"{'max s':>8}")
+        for stage, totals in sorted(summary.items(), key=lambda item: -item[1]['seconds']):
+            print(f"{stage:<28} {totals['count']:>6} {totals['errors']:>6} "\
+                  f"{totals['seconds']:>9.2f} {totals['seconds'] / totals['count']:>8.3f} "\
+                  f"{totals['max_seconds']:>8.3f}")
+
+    def write_prometheus(self, job: str) -> None:
+        """
+        Writes the per-stage totals as a Prometheus textfile, if a path is configured.
+        """
+        if self.prom_path is None:
+            return
+
+        metrics = [
+            ('scraper_stage_seconds_total', 'seconds', 'Total time spent in each scraper stage.'),
+            ('scraper_stage_count_total', 'count', 'Number of times each scraper stage ran.'),
+            ('scraper_stage_errors_total', 'errors', 'Number of times each scraper stage failed.'),
+        ]
+        summary = sorted(self.summary().items())
+
+        lines = []
+        for metric, key, description in metrics:
+            lines.append(f'# HELP {metric} {description}')
+            lines.append(f'# TYPE {metric} counter')
+            for stage, totals in summary:
+                lines.append(f'{metric}{{job="{job}",stage="{stage}"}} {totals[key]}')
+
+        with self.lock:
+            gauges = {metric: {**gauge, 'values': dict(gauge['values'])}
+                      for metric, gauge in self.gauges.items()}
+        for metric, gauge in sorted(gauges.items()):
+            lines.append(f'# HELP {metric} {gauge["description"]}')
+            lines.append(f'# TYPE {metric} gauge')
+            for labels, value in sorted(gauge['values'].items()):
+                label_text = ''.join(f',{name}="{label}"' for name, label in labels)
+                lines.append(f'{metric}{{job="{job}"{label_text}}} {value}')
+
+        # Written through a temporary file so the node exporter never reads half a file
+        tmp_path = f'{self.prom_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.prom_path)
+
+    def finish(self, job: str) -> None:
+        """
+        Prints the run summary and writes the Prometheus textfile. Called at the end of a run.
+        """
+        print(f"Timing summary for {job}:")
+        self.print_summary()
+        self.write_prometheus(job)
+        with self.lock:
+            if self.jsonl is not None:
+                self.jsonl.close()
+                self.jsonl = None
+
+
+instrumentation = Instrumentation(os.environ.get('SCRAPER_TIMINGS_FILE'),
+                                  os.environ.get('SCRAPER_PROM_FILE'))
+
+
+def span(stage: str, **span_tags):
+    """
+    Times a stage with the shared instrumentation, see Instrumentation.span.
+    """
+    return instrumentation.span(stage, **span_tags)
+
+
+@contextmanager
+def tags(**new_tags):
+    """
+    Adds tags to every span opened inside the block.
+    """
+    token = current_tags.set({**current_tags.get(), **new_tags})
+    try:
+        yield
+    finally:
+        current_tags.reset(token)
+
+
+def set_gauge(metric: str, value: float, description: str = '', **labels) -> None:
+    """
+    Sets a gauge on the shared instrumentation, see Instrumentation.set_gauge.
+    """
+    instrumentation.set_gauge(metric, value, description, **labels)
+
+
+def finish(job: str) -> None:
+    """
+    Prints the run summary of the shared instrumentation, see Instrumentation.finish.
+    """
+    instrumentation.finish(job)
@@ -0,0 +1,146 @@
+"""
+Helpers for parsing pages from naturalstattrick.com without a browser, and writing the tables
+read from them as CSVs.
+
+The parsers here work on the raw HTML of a page, so they can be fed either by a plain HTTP client
+or by the page source of a Selenium driver.
+"""
+
+import os
+import re
+import csv
+
+from lxml import html as lxml_html
+
+from util.checkpoint import atomic_write
+from util.team_maps import nst_team_mapping
+
+
+# Overridable so the scrapers can be pointed at a local server serving saved pages
+NST_BASE_URL = os.environ.get('NST_BASE_URL', 'https://www.naturalstattrick.com').rstrip('/')
+
+
+# Values of the stype parameter on games.php
+SEASON_TYPES = {
+    1: 'preseason',
+    2: 'regular',
+    3: 'playoffs',
+}
+
+
+def games_url(year: int, stype: int = 2) -> str:
+    """
+    Returns the URL of the games.php page listing every game of a season.
+
+    :param int year: Season, e.g. 2024 for 2024/2025.
+    :param int stype: Season type, one of SEASON_TYPES.
+    """
+    return f'{NST_BASE_URL}/games.php?fromseason={year}{year+1}&thruseason={year}{year+1}&'\
+           f'stype={stype}&sit=5v5&loc=B&team=All&rate=n'
+
+
+def game_report_url(year: int, game_id: int) -> str:
+    """
+    Returns the URL of the game.php report of a game, the page every table of a game is read from.
+
+    :param int year: Season, e.g. 2024 for 2024/2025.
+    :param int game_id: Game ID in naturalstattrick.
+    """
+    return f'{NST_BASE_URL}/game.php?season={year}{year+1}&game={game_id}&view=limited'
+
+
+def parse_report_hrefs(page_source: str) -> list[str]:
+    """
+    Finds the links to every 'Limited Report' on a games.php page.
+
+    :param str page_source: HTML of the page.
+    :return list[str]: href values of the links, in the order they appear on the page.
+    """
+    tree = lxml_html.fromstring(page_source)
+    return [link.get('href') for link in tree.iter('a')
+            if link.text_content().strip() == 'Limited Report' and link.get('href')]
+
+
+def parse_game_id(href: str) -> int:
+    """
+    Pulls the game ID out of a game report link, e.g. game.php?season=20242025&game=20001&view=limited
+
+    :param str href: Link to the game report.
+    :return int: NST game ID.
+    """
+    return int(href.split('game=')[1].split('&view')[0])
+
+
+def parse_report_details(page_source: str) -> tuple[str, str, str, str, str]:
+    """
+    Reads the title and date of a game report.
+
+    :param str page_source: HTML of the game.php page.
+    :return tuple: Year, month and day of the game, followed by the away and home team acronyms.
+    :raises ValueError: If the page has no report title, e.g. because it was cut off.
+    """
+    tree = lxml_html.fromstring(page_source)
+
+    titles = tree.xpath('//div[1]/div[5]/div/center/h1')
+    dates = tree.xpath('//div[1]/div[5]/div/center/h2')
+    if not titles or not dates:
+        raise ValueError("No report title found, the page may be incomplete")
+
+    report_title = titles[0].text_content().strip()
+    away_team, home_team = report_title.split(' @ ')
+
+    game_date = dates[0].text_content()
+    yy, mm, dd = re.search(r'(\d{4})-(\d{2})-(\d{2})', game_date).groups()
+
+    return yy, mm, dd, nst_team_mapping[away_team], nst_team_mapping[home_team]
+
+
+def parse_tables(page_source: str, table_ids: list[str]) -> dict[str, dict | None]:
+    """
+    Extracts the header and body of each of the given tables from a page.
+
+    :param str page_source: HTML of the page.
+    :param list[str] table_ids: Element IDs of the tables to extract.
+    :return dict: Maps each table ID to a dict with its 'header' and 'body', or to None if the
+                  table isn't on the page. A table may have no body rows, e.g. the PP table of a
+                  team that had no power play time.
+    :raises ValueError: If a table is on the page but has no header either.
+    """
+    tree = lxml_html.fromstring(page_source)
+
+    tables = {}
+    for table_id in table_ids:
+        found = tree.xpath(f'//table[@id="{table_id}"]')
+        if not found:
+            tables[table_id] = None
+            continue
+
+        # Unlike a browser, lxml doesn't add a tbody to tables whose rows sit directly under them
+        rows = found[0].xpath('./tbody/tr | ./tr')
+        header_rows = found[0].xpath('./thead/tr')
+        if not header_rows and rows and not rows[0].xpath('./td'):
+            # Without a thead, a leading row of only th cells is the header
+            header_rows, rows = rows[:1], rows[1:]
+
+        header = [] if not header_rows else \
+            [cell.text_content().strip() for cell in header_rows[-1].xpath('./th|./td')]
+        body = [[cell.text_content().strip() for cell in row.xpath('./th|./td')] for row in rows]
+        if not header:
+            raise ValueError(f"Table {table_id} has no header")
+
+        tables[table_id] = {'header': header, 'body': body}
+
+    return tables
+
+
+def write_table(data, dest):
+    """
+    Writes a table extracted from a page as a CSV, quoted the same way as the files produced by
+    the download buttons on NST.
+    :param dict data: Dict with the 'header' and 'body' of the table, as from parse_tables.
+    :param str dest: Path of the CSV to write.
+    """
+    with atomic_write(dest, newline='', encoding='utf-8') as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL, lineterminator='\n')
+        writer.writerow(data['header'])
+        writer.writerows(data['body'])
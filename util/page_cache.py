@@ -0,0 +1,160 @@
+"""
+On-disk cache of fetched pages, so that retries and reruns read pages from local disk instead of
+fetching them from NST again.
+
+Pages are stored gzipped under the SHA-256 of the URL and the fetch parameters, e.g. which backend
+fetched them, since a rendered page isn't the same HTML as the raw one. How long a page stays
+fresh depends on the URL, see PAGE_TTLS: the report of a finished game never changes so it is
+kept until evicted, while the games listing changes as games are played so it expires quickly.
+Once the cache is over its size limit, the least recently read pages are evicted first.
+
+The cache is off unless $SCRAPER_PAGE_CACHE_DIR is set.
+"""
+
+import os
+import re
+import gzip
+import time
+import hashlib
+import threading
+
+from util.checkpoint import atomic_write
+
+
+PAGE_CACHE_DIR = os.environ.get('SCRAPER_PAGE_CACHE_DIR')
+PAGE_CACHE_MAX_BYTES = int(os.environ.get('SCRAPER_PAGE_CACHE_MAX_MB', 256)) * 1024 * 1024
+
+# Seconds a page stays fresh, by the first pattern its URL matches. None never expires.
+PAGE_TTLS = [
+    (re.compile(r'/games\.php'), 10 * 60),
+    (re.compile(r'/game\.php'), None),
+]
+DEFAULT_TTL = 60 * 60
+
+# Evict down to this fraction of the limit, so that eviction doesn't run on every write
+EVICT_TO = 0.9
+
+
+def get_ttl(url: str) -> float | None:
+    """
+    Returns the seconds a page at the given URL stays fresh, or None if it never expires.
+    """
+    for pattern, ttl in PAGE_TTLS:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+
+class PageCache:
+    """
+    Gzipped pages on disk, keyed by URL and fetch parameters, with per-URL TTLs and LRU eviction.
+
+    The time a page was stored is its file's mtime and the time it was last read its atime, which
+    is set explicitly on every hit so it doesn't depend on how the filesystem is mounted.
+    """
+
+    def __init__(self, root: str, max_bytes: int = PAGE_CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.size = sum(os.path.getsize(path) for path in self._paths())
+
+    def _paths(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.html.gz'):
+                    yield os.path.join(dirpath, filename)
+
+    def path(self, url: str, params: str = '') -> str:
+        """
+        Returns the path the page at url, fetched with params, is cached at.
+        """
+        key = hashlib.sha256(f'{params}\n{url}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.root, key[:2], f'{key}.html.gz')
+
+    def get(self, url: str, params: str = '') -> str | None:
+        """
+        Returns the cached page, or None if it isn't cached or is no longer fresh.
+        """
+        path = self.path(url, params)
+        try:
+            stored = os.path.getmtime(path)
+            ttl = get_ttl(url)
+            if ttl is not None and time.time() - stored > ttl:
+                return None
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                page = f.read()
+            os.utime(path, (time.time(), stored))
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+        return page
+
+    def put(self, url: str, page: str, params: str = '') -> None:
+        """
+        Stores a page, evicting the least recently read pages if the cache is over its limit.
+        """
+        path = self.path(url, params)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = gzip.compress(page.encode('utf-8'))
+        previous = os.path.getsize(path) if os.path.exists(path) else 0
+        with atomic_write(path, 'wb') as f:
+            f.write(data)
+
+        with self.lock:
+            self.size += len(data) - previous
+            if self.size > self.max_bytes:
+                self.evict()
+
+    def forget(self, url: str, params: str = '') -> None:
+        """
+        Drops a page from the cache, e.g. one that turned out not to be usable.
+        """
+        path = self.path(url, params)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self.lock:
+            self.size -= size
+
+    def evict(self) -> None:
+        """
+        Removes the least recently read pages until the cache is back under its limit. Expects
+        the lock to be held.
+        """
+        entries = []
+        for path in self._paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if self.size <= self.max_bytes * EVICT_TO:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache() -> PageCache | None:
+    """
+    Returns the cache shared by every backend in the process, or None if it isn't enabled.
+    """
+    global _default_cache
+    if PAGE_CACHE_DIR is None:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PageCache(PAGE_CACHE_DIR)
+    return _default_cache
@@ -0,0 +1,275 @@
+"""
+Per-host rate limiting and retries shared by the scrapers, so that running several of them at once
+doesn't hammer the same site, and so that a site that starts throttling is backed off from rather
+than retried straight away.
+
+Each host gets a token bucket, refilled at the host's current rate. The rate adapts to how the
+host is responding: it creeps up while requests succeed quickly, and is cut back when latency
+climbs well above the best seen, when requests fail, and sharply when the host answers 429 or 503.
+A 429 or 503 also pauses every request to the host, for as long as its Retry-After asks or an
+exponentially growing, jittered delay otherwise.
+
+Every fetch path shares the limiter from get_default_limiter unless given its own. Its starting
+rate is $SCRAPER_RATE requests per second per host, or unlimited if that isn't set, in which case
+only the 429/503 pauses apply. Hosts with a published limit start at, and never exceed, the rate
+in HOST_RATES. The state of each host is exposed as gauges in the Prometheus
+textfile, see util.instrument.
+"""
+
+import os
+import time
+import random
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from util.instrument import set_gauge, span, tags
+
+
+# Delays between retries grow as BACKOFF_BASE * 2^attempt seconds, up to BACKOFF_CAP, with full
+# jitter so that workers that failed together don't retry together
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# How the rate of a host adapts: added after each fast success, as a fraction of the starting
+# rate, and multiplied on slow responses, errors and throttling
+RATE_INCREASE = 0.1
+SLOW_DECREASE = 0.9
+ERROR_DECREASE = 0.8
+THROTTLE_DECREASE = 0.5
+
+# A response counts as slow once the average latency is this many times the best seen
+SLOW_FACTOR = 3.0
+
+# Weight of the latest response in the average latency
+LATENCY_SMOOTHING = 0.2
+
+THROTTLE_STATUSES = (429, 503)
+
+# Bounds of an adaptive rate, as multiples of the rate it started at
+MIN_RATE_FACTOR = 0.1
+MAX_RATE_FACTOR = 4.0
+
+# Requests per second allowed by hosts that publish a limit, used as both their starting and
+# their maximum rate. baseball-reference blocks clients making more than 20 requests a minute.
+HOST_RATES = {
+    'www.baseball-reference.com': 20 / 60,
+}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    Returns the seconds asked for by a Retry-After header, given either as seconds or a date.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """
+    Returns a jittered delay before retry number `attempt`, growing exponentially.
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def retry_delay(attempt: int, error: Exception | None = None) -> float:
+    """
+    Returns how long to wait before retrying after `error`, honouring its Retry-After if it was a
+    throttled HTTP response.
+    """
+    response = getattr(error, 'response', None)
+    if response is not None and response.status_code in THROTTLE_STATUSES:
+        retry_after = parse_retry_after(response.headers.get('Retry-After'))
+        if retry_after is not None:
+            return retry_after
+    return backoff_delay(attempt)
+
+
+def call_with_retries(fn, retries: int = 3, label: str = ''):
+    """
+    Calls fn(attempt) until it succeeds, up to `retries` times, backing off between attempts as
+    in retry_delay. Each attempt is timed as an 'attempt' span tagged with its number.
+    :return: What fn returned.
+    """
+    for attempt in range(1, retries + 1):
+        try:
+            with tags(attempt=attempt), span('attempt'):
+                return fn(attempt)
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = retry_delay(attempt, e)
+            print(f"{label or 'Attempt'} failed on attempt {attempt}: {e}. "\
+                  f"Retrying in {delay:.1f} seconds...")
+            with span('backoff_wait'):
+                time.sleep(delay)
+
+
+class HostState:
+    """
+    Token bucket and adaptive rate of a single host.
+    """
+
+    def __init__(self, rate: float | None, burst: float, max_rate: float | None):
+        self.rate = rate
+        self.initial_rate = rate
+        self.min_rate = rate * MIN_RATE_FACTOR if rate else None
+        self.max_rate = max_rate
+        self.tokens = burst
+        self.refilled = time.monotonic()
+        self.paused_until = 0.0
+        self.throttles_in_a_row = 0
+        self.latency = None
+        self.best_latency = None
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+
+class RateLimiter:
+    """
+    Spaces out requests so that no more than `rate` per second are sent to any one host, with
+    bursts of up to `burst` requests, or the rate in host_rates for the hosts listed there. If
+    adaptive, each host's rate then moves between MIN_RATE_FACTOR and MAX_RATE_FACTOR times its
+    starting rate depending on how it responds, as reported through `record`, without going over
+    its rate in host_rates.
+    Safe to share between threads.
+    """
+
+    def __init__(self, rate: float | None = None, burst: float = 1.0, adaptive: bool = True,
+                 host_rates: dict[str, float] | None = None):
+        self.rate = rate
+        self.burst = burst
+        self.adaptive = adaptive
+        self.host_rates = host_rates or {}
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url: str) -> tuple[str, HostState]:
+        host = urlsplit(url).netloc
+        if host not in self.hosts:
+            if host in self.host_rates:
+                rate = max_rate = self.host_rates[host]
+            else:
+                rate = self.rate
+                max_rate = rate * MAX_RATE_FACTOR if rate else None
+            self.hosts[host] = HostState(rate, self.burst, max_rate)
+        return host, self.hosts[host]
+
+    def wait(self, url: str) -> None:
+        """
+        Blocks until a request to the host of the given URL is allowed.
+        """
+        while True:
+            with self.lock:
+                _, state = self._host(url)
+                now = time.monotonic()
+                if state.paused_until > now:
+                    delay = state.paused_until - now
+                elif not state.rate:
+                    return
+                else:
+                    state.tokens = min(self.burst,
+                                       state.tokens + (now - state.refilled) * state.rate)
+                    state.refilled = now
+                    if state.tokens >= 1:
+                        state.tokens -= 1
+                        return
+                    delay = (1 - state.tokens) / state.rate
+
+            time.sleep(delay)
+
+    def record(self, url: str, seconds: float | None = None, status: int | None = None,
+               error: bool = False, retry_after: float | None = None) -> None:
+        """
+        Reports how a request to the host of the given URL went, so its rate can adapt.
+        :param str url: URL that was requested.
+        :param float seconds: How long the request took, if it got a response.
+        :param int status: HTTP status of the response, if known.
+        :param bool error: Whether the request failed, other than by being throttled. Any other
+                           4xx or 5xx status counts as a failure as well.
+        :param float retry_after: Seconds the host asked to wait, from Retry-After.
+        """
+        with self.lock:
+            host, state = self._host(url)
+            state.requests += 1
+
+            if status in THROTTLE_STATUSES:
+                state.throttled += 1
+                state.throttles_in_a_row += 1
+                pause = retry_after if retry_after is not None \
+                    else backoff_delay(state.throttles_in_a_row)
+                state.paused_until = max(state.paused_until, time.monotonic() + pause)
+                state.tokens = 0
+                self._adjust(state, THROTTLE_DECREASE)
+                print(f"{host} is throttling requests, pausing for {pause:.1f} seconds")
+            elif error or (status is not None and status >= 400):
+                state.errors += 1
+                self._adjust(state, ERROR_DECREASE)
+            else:
+                state.throttles_in_a_row = 0
+                if seconds is not None:
+                    state.latency = seconds if state.latency is None else \
+                        LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * state.latency
+                    state.best_latency = seconds if state.best_latency is None else \
+                        min(state.best_latency, seconds)
+                    if state.latency > SLOW_FACTOR * state.best_latency:
+                        self._adjust(state, SLOW_DECREASE)
+                    elif self.adaptive and state.rate:
+                        state.rate = min(state.max_rate,
+                                         state.rate + RATE_INCREASE * state.initial_rate)
+
+            self._publish(host, state)
+
+    def _adjust(self, state: HostState, factor: float) -> None:
+        if self.adaptive and state.rate:
+            state.rate = max(state.min_rate, state.rate * factor)
+
+    def _publish(self, host: str, state: HostState) -> None:
+        set_gauge('scraper_host_rate', state.rate or 0,
+                  'Current requests per second allowed to each host, 0 if unlimited.', host=host)
+        set_gauge('scraper_host_latency_seconds', round(state.latency or 0, 6),
+                  'Moving average of the response time of each host.', host=host)
+        set_gauge('scraper_host_requests', state.requests,
+                  'Requests reported to the rate limiter for each host.', host=host)
+        set_gauge('scraper_host_errors', state.errors,
+                  'Failed requests to each host, other than throttled ones.', host=host)
+        set_gauge('scraper_host_throttled', state.throttled,
+                  'Requests each host answered with 429 or 503.', host=host)
+
+    def metrics(self) -> dict[str, dict]:
+        """
+        Returns the current state of every host seen so far.
+        """
+        with self.lock:
+            now = time.monotonic()
+            return {host: {'rate': state.rate, 'latency_seconds': state.latency,
+                           'requests': state.requests, 'errors': state.errors,
+                           'throttled': state.throttled,
+                           'paused_seconds': max(0.0, state.paused_until - now)}
+                    for host, state in self.hosts.items()}
+
+
+_default_limiter = None
+_default_limiter_lock = threading.Lock()
+
+
+def get_default_limiter() -> RateLimiter:
+    """
+    Returns the limiter shared by every fetch path in the process, see the module docstring.
+    """
+    global _default_limiter
+    with _default_limiter_lock:
+        if _default_limiter is None:
+            rate = os.environ.get('SCRAPER_RATE')
+            _default_limiter = RateLimiter(float(rate) if rate else None, host_rates=HOST_RATES)
+    return _default_limiter
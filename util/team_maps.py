@@ -1,3 +1,13 @@
+"""
+Team names and codes of the sites scraped.
+
+Each site has its own codes for some teams, e.g. NST's NJ is MoneyPuck's NJD, so every team is
+also given a canonical team_id, the league's own code, and a franchise, which stays the same when
+a team moves or is renamed, e.g. Arizona to Utah. nhl_teams is the canonical team dimension
+joined onto the NST game tables at ingest, see ingest_game_tables.py, and mlb_teams is joined
+onto the baseball-reference team records in baseball/derive_team_stats.py.
+"""
+
 nst_team_mapping = {
     "Minnesota Wild": "MIN",
     "Vegas Golden Knights": "VGK",
@@ -30,7 +40,85 @@ nst_team_mapping = {
     "Anaheim Ducks": "ANA",
     "Chicago Blackhawks": "CHI",
     "Arizona Coyotes": "ARI",
+    "Atlanta Thrashers": "ATL",
     "Utah Mammoth": "UTA",
     "Utah Hockey Club": "UTA",
     "New York Islanders": "NYI"
-}
\ No newline at end of file
+}
+
+# team_id is the NHL's code, nst and moneypuck are the codes on those sites, and franchise is the
+# team_id of the franchise today
+nhl_team_columns = ('team_id', 'name', 'nst', 'moneypuck', 'franchise')
+nhl_teams = [
+    ('ANA', 'Anaheim Ducks', 'ANA', 'ANA', 'ANA'),
+    ('ARI', 'Arizona Coyotes', 'ARI', 'ARI', 'UTA'),
+    ('ATL', 'Atlanta Thrashers', 'ATL', 'ATL', 'WPG'),
+    ('BOS', 'Boston Bruins', 'BOS', 'BOS', 'BOS'),
+    ('BUF', 'Buffalo Sabres', 'BUF', 'BUF', 'BUF'),
+    ('CAR', 'Carolina Hurricanes', 'CAR', 'CAR', 'CAR'),
+    ('CBJ', 'Columbus Blue Jackets', 'CBJ', 'CBJ', 'CBJ'),
+    ('CGY', 'Calgary Flames', 'CGY', 'CGY', 'CGY'),
+    ('CHI', 'Chicago Blackhawks', 'CHI', 'CHI', 'CHI'),
+    ('COL', 'Colorado Avalanche', 'COL', 'COL', 'COL'),
+    ('DAL', 'Dallas Stars', 'DAL', 'DAL', 'DAL'),
+    ('DET', 'Detroit Red Wings', 'DET', 'DET', 'DET'),
+    ('EDM', 'Edmonton Oilers', 'EDM', 'EDM', 'EDM'),
+    ('FLA', 'Florida Panthers', 'FLA', 'FLA', 'FLA'),
+    ('LAK', 'Los Angeles Kings', 'LA', 'LAK', 'LAK'),
+    ('MIN', 'Minnesota Wild', 'MIN', 'MIN', 'MIN'),
+    ('MTL', 'Montreal Canadiens', 'MTL', 'MTL', 'MTL'),
+    ('NJD', 'New Jersey Devils', 'NJ', 'NJD', 'NJD'),
+    ('NSH', 'Nashville Predators', 'NSH', 'NSH', 'NSH'),
+    ('NYI', 'New York Islanders', 'NYI', 'NYI', 'NYI'),
+    ('NYR', 'New York Rangers', 'NYR', 'NYR', 'NYR'),
+    ('OTT', 'Ottawa Senators', 'OTT', 'OTT', 'OTT'),
+    ('PHI', 'Philadelphia Flyers', 'PHI', 'PHI', 'PHI'),
+    ('PIT', 'Pittsburgh Penguins', 'PIT', 'PIT', 'PIT'),
+    ('SEA', 'Seattle Kraken', 'SEA', 'SEA', 'SEA'),
+    ('SJS', 'San Jose Sharks', 'SJ', 'SJS', 'SJS'),
+    ('STL', 'St Louis Blues', 'STL', 'STL', 'STL'),
+    ('TBL', 'Tampa Bay Lightning', 'TB', 'TBL', 'TBL'),
+    ('TOR', 'Toronto Maple Leafs', 'TOR', 'TOR', 'TOR'),
+    ('UTA', 'Utah Mammoth', 'UTA', 'UTA', 'UTA'),
+    ('VAN', 'Vancouver Canucks', 'VAN', 'VAN', 'VAN'),
+    ('VGK', 'Vegas Golden Knights', 'VGK', 'VGK', 'VGK'),
+    ('WPG', 'Winnipeg Jets', 'WPG', 'WPG', 'WPG'),
+    ('WSH', 'Washington Capitals', 'WSH', 'WSH', 'WSH'),
+]
+
+# team_id is MLB's code, bbref is baseball-reference's, and franchise is the team_id of the
+# franchise today
+mlb_team_columns = ('team_id', 'name', 'bbref', 'franchise')
+mlb_teams = [
+    ('ARI', 'Arizona Diamondbacks', 'ARI', 'ARI'),
+    ('ATH', 'Athletics', 'ATH', 'ATH'),
+    ('ATL', 'Atlanta Braves', 'ATL', 'ATL'),
+    ('BAL', 'Baltimore Orioles', 'BAL', 'BAL'),
+    ('BOS', 'Boston Red Sox', 'BOS', 'BOS'),
+    ('CHC', 'Chicago Cubs', 'CHC', 'CHC'),
+    ('CWS', 'Chicago White Sox', 'CHW', 'CWS'),
+    ('CIN', 'Cincinnati Reds', 'CIN', 'CIN'),
+    ('CLE', 'Cleveland Guardians', 'CLE', 'CLE'),
+    ('COL', 'Colorado Rockies', 'COL', 'COL'),
+    ('DET', 'Detroit Tigers', 'DET', 'DET'),
+    ('HOU', 'Houston Astros', 'HOU', 'HOU'),
+    ('KC', 'Kansas City Royals', 'KCR', 'KC'),
+    ('LAA', 'Los Angeles Angels', 'LAA', 'LAA'),
+    ('LAD', 'Los Angeles Dodgers', 'LAD', 'LAD'),
+    ('MIA', 'Miami Marlins', 'MIA', 'MIA'),
+    ('MIL', 'Milwaukee Brewers', 'MIL', 'MIL'),
+    ('MIN', 'Minnesota Twins', 'MIN', 'MIN'),
+    ('NYM', 'New York Mets', 'NYM', 'NYM'),
+    ('NYY', 'New York Yankees', 'NYY', 'NYY'),
+    ('OAK', 'Oakland Athletics', 'OAK', 'ATH'),
+    ('PHI', 'Philadelphia Phillies', 'PHI', 'PHI'),
+    ('PIT', 'Pittsburgh Pirates', 'PIT', 'PIT'),
+    ('SD', 'San Diego Padres', 'SDP', 'SD'),
+    ('SEA', 'Seattle Mariners', 'SEA', 'SEA'),
+    ('SF', 'San Francisco Giants', 'SFG', 'SF'),
+    ('STL', 'St. Louis Cardinals', 'STL', 'STL'),
+    ('TB', 'Tampa Bay Rays', 'TBR', 'TB'),
+    ('TEX', 'Texas Rangers', 'TEX', 'TEX'),
+    ('TOR', 'Toronto Blue Jays', 'TOR', 'TOR'),
+    ('WSH', 'Washington Nationals', 'WSN', 'WSH'),
+]
@@ -0,0 +1,127 @@
+"""
+Explicit waits for the Selenium scrapers, used in place of fixed time.sleep calls.
+
+Each wait returns as soon as its condition is met and raises a TimeoutException once the
+timeout runs out.
+
+Selenium is only imported by the waits that use it, so that scrapers that only need
+DEFAULT_TIMEOUT or the download helpers don't pay for importing it.
+"""
+
+import os
+import time
+
+
+DEFAULT_TIMEOUT = 30
+
+# How often to check the download directory
+POLL_INTERVAL = 0.1
+
+# Suffixes Chrome gives to downloads that haven't finished yet
+PARTIAL_SUFFIXES = ('.crdownload', '.tmp')
+
+
+def wait_for_page_ready(driver, timeout: float = DEFAULT_TIMEOUT) -> None:
+    """
+    Waits until the document in the driver has finished loading. For drivers using the eager
+    page load strategy, waits for the DOM to be ready instead, without waiting on subresources.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    ready_states = ['complete']
+    if driver.capabilities.get('pageLoadStrategy') == 'eager':
+        ready_states.append('interactive')
+
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script('return document.readyState') in ready_states)
+
+
+def start_navigation(driver, url: str) -> None:
+    """
+    Starts loading url in the driver's current window without waiting for it, so that other
+    windows can be loading at the same time. Use wait_for_navigation to wait for it to load.
+    """
+    driver.execute_script('window.__scraperStale = true; window.location.href = arguments[0];',
+                          url)
+
+
+def wait_for_navigation(driver, timeout: float = DEFAULT_TIMEOUT) -> None:
+    """
+    Waits until the page started by start_navigation has replaced the one before it, and has
+    finished loading as in wait_for_page_ready.
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script('return window.__scraperStale === undefined'))
+    wait_for_page_ready(driver, timeout)
+
+
+def wait_for_element(driver, by: str, value: str, timeout: float = DEFAULT_TIMEOUT):
+    """
+    Waits until an element is present in the DOM and returns it.
+    """
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
+
+
+def wait_for_visible(driver, by: str, value: str, timeout: float = DEFAULT_TIMEOUT):
+    """
+    Waits until an element is present in the DOM and displayed, and returns it.
+    """
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    return WebDriverWait(driver, timeout).until(EC.visibility_of_element_located((by, value)))
+
+
+def list_downloads(download_dir: str) -> set[str]:
+    """
+    Returns the names of the files currently in the download directory, which is treated as
+    empty if it hasn't been created yet.
+    """
+    if not os.path.isdir(download_dir):
+        return set()
+    return set(os.listdir(download_dir))
+
+
+def wait_for_download(download_dir: str, existing: set[str], suffix: str = '.csv',
+                      timeout: float = DEFAULT_TIMEOUT) -> str:
+    """
+    Waits for a new download to finish in download_dir and returns its path.
+
+    A download is finished once no partial downloads are left in the directory and a new file
+    with the expected suffix is there with a non-zero size that has stopped changing.
+
+    :param str download_dir: Directory Chrome downloads files into.
+    :param set[str] existing: Names of the files in the directory before the download started,
+                              as from list_downloads.
+    :param str suffix: Extension the downloaded file is expected to have.
+    :param float timeout: Seconds to wait before giving up.
+    :return str: Path of the downloaded file.
+    """
+    deadline = time.monotonic() + timeout
+    last_size = None
+
+    while time.monotonic() < deadline:
+        files = list_downloads(download_dir)
+        partial = [f for f in files if f.endswith(PARTIAL_SUFFIXES)]
+        new = sorted(f for f in files - existing if f.endswith(suffix))
+
+        if new and not partial:
+            path = os.path.join(download_dir, new[0])
+            size = os.path.getsize(path)
+            if size > 0 and size == last_size:
+                return path
+            last_size = size
+        else:
+            last_size = None
+
+        time.sleep(POLL_INTERVAL)
+
+    from selenium.common.exceptions import TimeoutException
+
+    raise TimeoutException(f"No completed {suffix} download in {download_dir} "\
+                           f"after {timeout} seconds")
@@ -0,0 +1,201 @@
+"""
+Durable queue of games to scrape, kept in a SQLite file so any number of workers can drain it.
+
+Discovery enqueues (season, game_id) jobs and workers claim them with time-limited leases. A
+worker that finishes a game marks it done, and one that gives up marks it failed so it is retried
+up to a set number of attempts. If a worker dies or stalls, its lease expires and the game is
+handed to the next worker that asks, rather than staying stuck until the next run. A worker
+keeps its lease on a game that takes a while alive with a LeaseHeartbeat.
+"""
+
+import os
+import time
+import sqlite3
+import threading
+
+
+DEFAULT_QUEUE_PATH = os.environ.get('WORK_QUEUE_PATH', 'work_queue.sqlite')
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+class WorkQueue:
+    """
+    Queue of (season, game_id) jobs with leases, backed by a local SQLite file.
+
+    Each job is 'pending', 'leased', 'done' or 'failed'. A leased job whose lease has expired is
+    treated as pending. Jobs are claimed in the order they were enqueued.
+    """
+
+    def __init__(self, path: str = DEFAULT_QUEUE_PATH, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        # Transactions are opened explicitly, so that claims take the write lock up front
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                season INTEGER NOT NULL,
+                game_id INTEGER NOT NULL,
+                state TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                last_error TEXT,
+                PRIMARY KEY (season, game_id)
+            )
+        """)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, jobs) -> int:
+        """
+        Adds (season, game_id) jobs to the queue, ignoring any that are already in it.
+        :return int: Number of jobs added.
+        """
+        before = self.conn.total_changes
+        self.conn.execute("BEGIN IMMEDIATE")
+        self.conn.executemany("INSERT OR IGNORE INTO jobs (season, game_id) VALUES (?, ?)",
+                              list(jobs))
+        self.conn.execute("COMMIT")
+        return self.conn.total_changes - before
+
+    def claim(self, owner: str, lease_seconds: float = DEFAULT_LEASE_SECONDS,
+              limit: int = 1) -> list[tuple[int, int]]:
+        """
+        Leases up to `limit` jobs to owner, reclaiming any whose lease has expired.
+        :return list: (season, game_id) of each job claimed, empty if none are available.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Jobs whose last attempt was abandoned count as failed once out of attempts
+            self.conn.execute("""
+                UPDATE jobs SET state = 'failed', owner = NULL, lease_expires = NULL,
+                                last_error = 'Lease expired'
+                WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?
+            """, [now, self.max_attempts])
+            rows = self.conn.execute("""
+                SELECT season, game_id FROM jobs
+                WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)
+                ORDER BY rowid
+                LIMIT ?
+            """, [now, limit]).fetchall()
+            self.conn.executemany("""
+                UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?,
+                                attempts = attempts + 1
+                WHERE season = ? AND game_id = ?
+            """, [(owner, now + lease_seconds, season, game_id) for season, game_id in rows])
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        self.conn.execute("COMMIT")
+        return rows
+
+    def renew(self, owner: str, season: int, game_id: int,
+              lease_seconds: float = DEFAULT_LEASE_SECONDS) -> bool:
+        """
+        Extends owner's lease on a job.
+        :return bool: Whether owner still held the lease.
+        """
+        cursor = self.conn.execute("""
+            UPDATE jobs SET lease_expires = ?
+            WHERE season = ? AND game_id = ? AND state = 'leased' AND owner = ?
+        """, [time.time() + lease_seconds, season, game_id, owner])
+        return cursor.rowcount == 1
+
+    def complete(self, season: int, game_id: int) -> None:
+        """
+        Marks a job as done, even if its lease had expired, since the game was still scraped.
+        """
+        self.conn.execute("""
+            UPDATE jobs SET state = 'done', owner = NULL, lease_expires = NULL, last_error = NULL
+            WHERE season = ? AND game_id = ?
+        """, [season, game_id])
+
+    def fail(self, season: int, game_id: int, error: str | None = None,
+             owner: str | None = None) -> bool:
+        """
+        Releases a job that couldn't be scraped, back to pending unless it has used up its
+        attempts, in which case it is marked failed. If owner is set, the job is only released
+        while owner still holds its lease, so a worker whose lease was taken over doesn't release
+        the job out from under the worker that holds it now.
+        :return bool: Whether the job was released.
+        """
+        cursor = self.conn.execute("""
+            UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                            owner = NULL, lease_expires = NULL, last_error = ?
+            WHERE season = ? AND game_id = ? AND state != 'done'
+              AND (? IS NULL OR (state = 'leased' AND owner = ?))
+        """, [self.max_attempts, error, season, game_id, owner, owner])
+        return cursor.rowcount == 1
+
+    def counts(self) -> dict[str, int]:
+        """
+        Returns the number of jobs in each state, counting expired leases as pending.
+        """
+        rows = self.conn.execute("""
+            SELECT CASE WHEN state = 'leased' AND lease_expires < ? THEN 'pending'
+                        ELSE state END,
+                   count(*)
+            FROM jobs GROUP BY 1
+        """, [time.time()]).fetchall()
+        counts = {'pending': 0, 'leased': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return counts
+
+    def next_expiry(self) -> float | None:
+        """
+        Returns when the earliest active lease expires, or None if no job is leased.
+        """
+        return self.conn.execute("SELECT min(lease_expires) FROM jobs WHERE state = 'leased'")\
+                        .fetchone()[0]
+
+
+class LeaseHeartbeat:
+    """
+    Renews owner's lease on a job from a background thread for as long as the block it guards
+    runs, so a game that takes longer than one lease isn't handed to another worker meanwhile.
+
+    The lease is renewed every third of its length, over a connection of its own since SQLite
+    connections can't be shared between threads. If the lease was lost anyway, e.g. because the
+    worker stalled past it, lost is set and the heartbeat stops.
+
+        with LeaseHeartbeat(queue.path, owner, season, game_id, lease_seconds):
+            scrape(season, game_id)
+    """
+
+    def __init__(self, path: str, owner: str, season: int, game_id: int,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.path = path
+        self.owner = owner
+        self.season = season
+        self.game_id = game_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'heartbeat-{game_id}',
+                                        daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        with WorkQueue(self.path) as work_queue:
+            while not self._stop.wait(self.lease_seconds / 3):
+                if not work_queue.renew(self.owner, self.season, self.game_id,
+                                        self.lease_seconds):
+                    self.lost = True
+                    return